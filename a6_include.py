@@ -6,6 +6,21 @@
 #              Don't modify the contents of this file.
 
 
+import gc
+import os
+import pickle
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import compress
+
+# NumPy is optional, batch hashing falls back to the scalar functions
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
 # -------------- Used by both HashMaps (SC & OA)  -------------- #
 
 class DynamicArrayException(Exception):
@@ -78,6 +93,62 @@ class DynamicArray:
         return len(self._data)
 
 
+# primes below this are sieved once, so picking a capacity is a binary search
+_SIEVE_LIMIT = 1 << 16
+
+
+def _sieve(limit: int) -> array:
+    """Return array of every prime below limit"""
+    candidates = bytearray([1]) * limit
+    candidates[:2] = b'\x00\x00'
+    for factor in range(2, int(limit ** 0.5) + 1):
+        if candidates[factor]:
+            multiples = range(factor * factor, limit, factor)
+            candidates[factor * factor::factor] = bytes(len(multiples))
+    return array('L', compress(range(limit), candidates))
+
+
+_PRIMES = _sieve(_SIEVE_LIMIT)
+
+
+def is_prime(number: int) -> bool:
+    """
+    Return True if number is prime
+    Past the sieve, trial divides by the sieved primes only
+    """
+    if number < _SIEVE_LIMIT:
+        index = bisect_left(_PRIMES, number)
+        return index < len(_PRIMES) and _PRIMES[index] == number
+
+    for factor in _PRIMES:
+        if factor * factor > number:
+            return True
+        if number % factor == 0:
+            return False
+
+    # beyond the square of the sieve, continue with odd factors
+    factor = _SIEVE_LIMIT + 1
+    while factor * factor <= number:
+        if number % factor == 0:
+            return False
+        factor += 2
+    return True
+
+
+def next_prime(number: int) -> int:
+    """
+    Return the smallest odd prime >= number, used as a hash table capacity
+    """
+    index = bisect_left(_PRIMES, max(number, 3))
+    if index < len(_PRIMES):
+        return _PRIMES[index]
+
+    number |= 1
+    while not is_prime(number):
+        number += 2
+    return number
+
+
 def hash_function_1(key: str) -> int:
     """Sample Hash function #1 to be used with HashMap implementation"""
     hash = 0
@@ -96,6 +167,277 @@ def hash_function_2(key: str) -> int:
     return hash
 
 
+def _code_points(keys: list, width: int):
+    """
+    Encode keys that are all width characters long into a matrix
+    of code points, one row per key
+    """
+    data = ''.join(keys).encode('utf-32-le', 'surrogatepass')
+    return np.frombuffer(data, dtype=np.uint32).reshape(len(keys), width)
+
+
+def _hash_by_length(keys: list, row_hash: callable) -> list:
+    """
+    Return row_hash of the code point matrix of every group of keys
+    of the same length, in the order of keys
+    Grouping keeps a single long key from padding every other row
+    """
+    lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+    order = np.argsort(lengths, kind='stable')
+    ordered = [keys[index] for index in order.tolist()]
+    starts = np.flatnonzero(np.diff(lengths[order], prepend=-1)).tolist()
+
+    hashes = np.empty(len(keys), dtype=np.int64)
+    for start, stop in zip(starts, starts[1:] + [len(keys)]):
+        width = len(ordered[start])
+        hashes[order[start:stop]] = row_hash(
+            _code_points(ordered[start:stop], width))
+    return hashes.tolist()
+
+
+def _sum_rows(points):
+    """Sum of every row of a code point matrix"""
+    return points.sum(axis=1, dtype=np.int64)
+
+
+def _weigh_rows(points):
+    """Every row of a code point matrix times the weights 1, 2, 3, ..."""
+    weights = np.arange(1, points.shape[1] + 1, dtype=np.int64)
+    return points.astype(np.int64) @ weights
+
+
+def hash_function_1_batch(keys: list) -> list:
+    """
+    Return hash_function_1 of every key in keys, computed with NumPy
+    as the row sums of the keys' code point matrices
+    """
+    if np is None or not keys:
+        return [hash_function_1(key) for key in keys]
+    return _hash_by_length(keys, _sum_rows)
+
+
+def hash_function_2_batch(keys: list) -> list:
+    """
+    Return hash_function_2 of every key in keys, computed with NumPy
+    as the keys' code point matrices times the weights 1, 2, 3, ...
+    """
+    if np is None or not keys:
+        return [hash_function_2(key) for key in keys]
+    return _hash_by_length(keys, _weigh_rows)
+
+
+def hash_batch(function: callable, keys: list) -> list:
+    """
+    Return function(key) for every key in keys, using the vectorized
+    version of the sample hash functions when there is one
+    """
+    batch = _BATCH_FUNCTIONS.get(function)
+    if batch is not None:
+        return batch(keys)
+    return [function(key) for key in keys]
+
+
+_BATCH_FUNCTIONS = {
+    hash_function_1: hash_function_1_batch,
+    hash_function_2: hash_function_2_batch,
+}
+
+
+_MASK_64 = (1 << 64) - 1
+
+
+def fnv1a_hash(key: str) -> int:
+    """64-bit FNV-1a hash of the key's UTF-8 bytes"""
+    hash = 0xcbf29ce484222325
+    for byte in key.encode('utf-8', 'surrogatepass'):
+        hash = ((hash ^ byte) * 0x100000001b3) & _MASK_64
+    return hash
+
+
+def _sip_round(v0: int, v1: int, v2: int, v3: int) -> tuple:
+    """One SipRound over the four 64-bit state words"""
+    v0 = (v0 + v1) & _MASK_64
+    v1 = ((v1 << 13) | (v1 >> 51)) & _MASK_64 ^ v0
+    v0 = ((v0 << 32) | (v0 >> 32)) & _MASK_64
+    v2 = (v2 + v3) & _MASK_64
+    v3 = ((v3 << 16) | (v3 >> 48)) & _MASK_64 ^ v2
+    v0 = (v0 + v3) & _MASK_64
+    v3 = ((v3 << 21) | (v3 >> 43)) & _MASK_64 ^ v0
+    v2 = (v2 + v1) & _MASK_64
+    v1 = ((v1 << 17) | (v1 >> 47)) & _MASK_64 ^ v2
+    v2 = ((v2 << 32) | (v2 >> 32)) & _MASK_64
+    return v0, v1, v2, v3
+
+
+def siphash_2_4(secret: bytes, data: bytes) -> int:
+    """SipHash-2-4 of data under a 16 byte secret key"""
+    k0 = int.from_bytes(secret[:8], 'little')
+    k1 = int.from_bytes(secret[8:16], 'little')
+    v0, v1 = k0 ^ 0x736f6d6570736575, k1 ^ 0x646f72616e646f6d
+    v2, v3 = k0 ^ 0x6c7967656e657261, k1 ^ 0x7465646279746573
+
+    end = len(data) - len(data) % 8
+    for start in range(0, end, 8):
+        word = int.from_bytes(data[start:start + 8], 'little')
+        v3 ^= word
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+        v0 ^= word
+
+    # last word holds the remaining bytes and the length in its top byte
+    word = (len(data) & 0xff) << 56 | int.from_bytes(data[end:], 'little')
+    v3 ^= word
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    v0 ^= word
+
+    v2 ^= 0xff
+    for _ in range(4):
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def make_siphash(secret: bytes) -> callable:
+    """Return a hash function computing SipHash-2-4 of a key under secret"""
+    def siphash_hash(key: str) -> int:
+        """Keyed SipHash-2-4 of the key's UTF-8 bytes"""
+        return siphash_2_4(secret, key.encode('utf-8', 'surrogatepass'))
+    return siphash_hash
+
+
+# keyed with a random secret per process, like Python's own str hash
+siphash_hash = make_siphash(os.urandom(16))
+
+
+def builtin_hash(key: str) -> int:
+    """Python's built-in hash of the key, as an unsigned 64-bit integer"""
+    return hash(key) & _MASK_64
+
+
+# hash functions selectable by name, e.g. HashMap(11, 'fnv1a')
+HASH_FUNCTIONS = {
+    'hash_function_1': hash_function_1,
+    'hash_function_2': hash_function_2,
+    'fnv1a': fnv1a_hash,
+    'siphash': siphash_hash,
+    'builtin': builtin_hash,
+}
+
+
+def register_hash_function(name: str, function: callable) -> None:
+    """Make function selectable by name."""
+    HASH_FUNCTIONS[name] = function
+
+
+def get_hash_function(function) -> callable:
+    """
+    Return the hash function registered under a name,
+    or the given function itself if it is already callable
+    """
+    if callable(function):
+        return function
+    return HASH_FUNCTIONS[function]
+
+
+def mix_hash(hash_result: int) -> int:
+    """
+    Scramble a hash so its low bits depend on all of its bits, for
+    indexing power-of-two tables with a mask instead of a prime modulo
+    """
+    hash_result = (hash_result ^ (hash_result >> 32)) & _MASK_64
+    return (hash_result * 0x9e3779b97f4a7c15 & _MASK_64) >> 32
+
+
+# snapshots written by the hash maps' dump(): magic, then a pickled header
+# dict and the pickled columns it counts, one after another
+SNAPSHOT_MAGIC = b'HMSNAP01'
+
+# hashed into every header, so load() can tell whether the cached hashes
+# match the hash function in the loading process
+_SNAPSHOT_PROBE = 'hash map snapshot'
+
+
+def hash_function_name(function: callable) -> str:
+    """Return the name function is registered under, or None."""
+    for name, registered in HASH_FUNCTIONS.items():
+        if registered is function:
+            return name
+    return None
+
+
+def pack_hashes(hashes: list):
+    """
+    Return hashes as an array of unsigned 64-bit integers, or the list
+    itself if a custom hash function produced one that does not fit
+    """
+    try:
+        return array('Q', hashes)
+    except OverflowError:
+        return hashes
+
+
+@contextmanager
+def paused_gc():
+    """
+    Pause the cyclic garbage collector while a block allocates many
+    objects that form no cycles, which would otherwise trigger a
+    collection every few hundred allocations.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def write_snapshot(file, kind: str, function: callable, header: dict,
+                   *columns) -> None:
+    """
+    Write a snapshot of kind, the name of the layout it stores, to the open
+    binary file: header plus the hash function's name and fingerprint,
+    followed by columns
+    """
+    header = dict(header, kind=kind, columns=len(columns),
+                  function=hash_function_name(function),
+                  fingerprint=function(_SNAPSHOT_PROBE))
+    file.write(SNAPSHOT_MAGIC)
+    pickle.dump(header, file, pickle.HIGHEST_PROTOCOL)
+    for column in columns:
+        pickle.dump(column, file, pickle.HIGHEST_PROTOCOL)
+
+
+def read_snapshot(file, kind: str, function=None) -> tuple:
+    """
+    Read a snapshot of kind from the open binary file.
+    Only read snapshots from trusted sources: columns are unpickled.
+
+    function overrides the hash function the snapshot was written with,
+    and is required if that one was not registered by name.
+
+    Return (header, columns, hash function, True if the cached hashes
+    are valid for that function in this process).
+    """
+    if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+        raise ValueError('not a hash map snapshot')
+    header = pickle.load(file)
+    if header['kind'] != kind:
+        raise ValueError(f"cannot load a snapshot of kind {header['kind']!r} "
+                         f"as {kind!r}")
+
+    if function is None:
+        if header['function'] is None:
+            raise ValueError('snapshot was written with an unregistered hash '
+                             'function, pass it to load()')
+        function = header['function']
+    function = get_hash_function(function)
+
+    columns = [pickle.load(file) for _ in range(header['columns'])]
+    return header, columns, function, \
+        function(_SNAPSHOT_PROBE) == header['fingerprint']
+
+
 # --------- For use in Separate Chaining (SC) HashMap  --------- #
 
 class SLNode:
@@ -103,11 +445,15 @@ class SLNode:
     Singly Linked List node for use in a hash map
     """
 
-    def __init__(self, key: str, value: object, next: "SLNode" = None) -> None:
-        """Initialize node given a key and value."""
+    __slots__ = ('key', 'value', 'next', 'hash')
+
+    def __init__(self, key: str, value: object, next: "SLNode" = None,
+                 hash: int = None) -> None:
+        """Initialize node given a key, value and the key's cached hash."""
         self.key = key
         self.value = value
         self.next = next
+        self.hash = hash
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -119,6 +465,8 @@ class LinkedListIterator:
     Separate iterator class for LinkedList
     """
 
+    __slots__ = ('_node',)
+
     def __init__(self, current_node: SLNode) -> None:
         """Initialize the iterator with a node."""
         self._node = current_node
@@ -141,9 +489,15 @@ class LinkedListIterator:
 class LinkedList:
     """
     Class implementing a Singly Linked List
-    Supported methods are: insert, remove, contains, length, iterator
+    Supported methods are: insert, remove, pop, contains, get, put, update,
+    items, entries, length, iterator
+
+    Methods taking an optional hash compare it against each node's cached
+    hash before comparing keys
     """
 
+    __slots__ = ('_head', '_size')
+
     def __init__(self) -> None:
         """
         Initialize new linked list;
@@ -168,53 +522,231 @@ class LinkedList:
         """Return an iterator for the list, starting at the head."""
         return LinkedListIterator(self._head)
 
-    def insert(self, key: str, value: object) -> None:
+    def insert(self, key: str, value: object, hash: int = None) -> None:
         """Insert new node at front of the list."""
-        self._head = SLNode(key, value, self._head)
+        self._head = SLNode(key, value, self._head, hash)
         self._size += 1
 
-    def remove(self, key: str) -> bool:
+    def remove(self, key: str, hash: int = None) -> bool:
         """
         Remove first node with matching key.
         Return True if removal was successful, False otherwise.
         """
+        return self.pop(key, hash)[0]
+
+    def pop(self, key: str, hash: int = None) -> tuple:
+        """
+        Remove first node with matching key.
+        Return (True, its value) if removal was successful, (False, None) otherwise.
+        """
         previous, node = None, self._head
         while node:
 
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 if previous:
                     previous.next = node.next
                 else:
                     self._head = node.next
                 self._size -= 1
-                return True
+                return True, node.value
 
             previous, node = node, node.next
-        return False
+        return False, None
 
-    def contains(self, key: str) -> SLNode:
+    def contains(self, key: str, hash: int = None) -> SLNode:
         """Return node with matching key, or None if no match"""
         node = self._head
         while node:
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 return node
             node = node.next
         return node
 
+    def get(self, key: str, default: object = None, hash: int = None) -> object:
+        """Return value stored under key, or default if no match"""
+        node = self.contains(key, hash)
+        return default if node is None else node.value
+
+    def put(self, key: str, value: object, hash: int = None) -> bool:
+        """
+        Replace value of node with matching key or insert a new node.
+        Return True if a new node was inserted, False otherwise.
+        """
+        node = self.contains(key, hash)
+        if node is None:
+            self.insert(key, value, hash)
+            return True
+        node.value = value
+        return False
+
+    def update(self, key: str, function: callable, default: object = None,
+               hash: int = None) -> tuple:
+        """
+        Replace value v of node with matching key by function(v), or insert
+        a new node with value function(default).
+        Return (True if a new node was inserted, the new value).
+        """
+        node = self.contains(key, hash)
+        if node is None:
+            value = function(default)
+            self.insert(key, value, hash)
+            return True, value
+        node.value = function(node.value)
+        return False, node.value
+
+    def items(self):
+        """Yield (key, value) tuples starting at the head."""
+        node = self._head
+        while node:
+            yield node.key, node.value
+            node = node.next
+
+    def entries(self):
+        """Yield (key, value, hash) tuples starting at the head."""
+        node = self._head
+        while node:
+            yield node.key, node.value, node.hash
+            node = node.next
+
     def length(self) -> int:
         """Return the length of the list."""
         return self._size
 
 
+class ArrayBucket:
+    """
+    Bucket for a hash map that keeps its entries in parallel key/value/hash
+    lists instead of a chain of nodes, so lookups scan a contiguous list in C
+    Supported methods are: insert, remove, pop, contains, get, put, update,
+    items, entries, length, iterator
+
+    Methods taking an optional hash scan the cached hashes first and only
+    compare keys whose hash matches
+    """
+
+    __slots__ = ('_keys', '_values', '_hashes')
+
+    def __init__(self) -> None:
+        """Initialize new empty bucket."""
+        self._keys = []
+        self._values = []
+        self._hashes = []
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        content = ' -> '.join('(' + str(key) + ': ' + str(value) + ')'
+                              for key, value in self.items())
+        return 'ARR [' + content + ']'
+
+    def __iter__(self):
+        """Return an iterator over (key, value) tuples."""
+        return self.items()
+
+    def _index(self, key: str, hash: int = None) -> int:
+        """Return position of key in the bucket, or -1 if no match"""
+        try:
+            if hash is None:
+                return self._keys.index(key)
+
+            index = self._hashes.index(hash)
+            while self._keys[index] != key:
+                index = self._hashes.index(hash, index + 1)
+            return index
+        except ValueError:
+            return -1
+
+    def insert(self, key: str, value: object, hash: int = None) -> None:
+        """Insert new entry at the end of the bucket."""
+        self._keys.append(key)
+        self._values.append(value)
+        self._hashes.append(hash)
+
+    def remove(self, key: str, hash: int = None) -> bool:
+        """
+        Remove entry with matching key by moving the last entry into its place.
+        Return True if removal was successful, False otherwise.
+        """
+        return self.pop(key, hash)[0]
+
+    def pop(self, key: str, hash: int = None) -> tuple:
+        """
+        Remove entry with matching key by moving the last entry into its place.
+        Return (True, its value) if removal was successful, (False, None) otherwise.
+        """
+        index = self._index(key, hash)
+        if index < 0:
+            return False, None
+
+        value = self._values[index]
+        last_key, last_value = self._keys.pop(), self._values.pop()
+        last_hash = self._hashes.pop()
+        if index < len(self._keys):
+            self._keys[index] = last_key
+            self._values[index] = last_value
+            self._hashes[index] = last_hash
+        return True, value
+
+    def contains(self, key: str, hash: int = None) -> bool:
+        """Return True if an entry with matching key exists"""
+        return self._index(key, hash) >= 0
+
+    def get(self, key: str, default: object = None, hash: int = None) -> object:
+        """Return value stored under key, or default if no match"""
+        index = self._index(key, hash)
+        return default if index < 0 else self._values[index]
+
+    def put(self, key: str, value: object, hash: int = None) -> bool:
+        """
+        Replace value of entry with matching key or insert a new entry.
+        Return True if a new entry was inserted, False otherwise.
+        """
+        index = self._index(key, hash)
+        if index < 0:
+            self.insert(key, value, hash)
+            return True
+        self._values[index] = value
+        return False
+
+    def update(self, key: str, function: callable, default: object = None,
+               hash: int = None) -> tuple:
+        """
+        Replace value v of entry with matching key by function(v), or insert
+        a new entry with value function(default).
+        Return (True if a new entry was inserted, the new value).
+        """
+        index = self._index(key, hash)
+        if index < 0:
+            value = function(default)
+            self.insert(key, value, hash)
+            return True, value
+        value = self._values[index] = function(self._values[index])
+        return False, value
+
+    def items(self):
+        """Return an iterator over (key, value) tuples."""
+        return zip(self._keys, self._values)
+
+    def entries(self):
+        """Return an iterator over (key, value, hash) tuples."""
+        return zip(self._keys, self._values, self._hashes)
+
+    def length(self) -> int:
+        """Return the number of entries in the bucket."""
+        return len(self._keys)
+
+
 # ---------- For use in Open Addressing (OA) HashMap  ---------- #
 
 class HashEntry:
 
-    def __init__(self, key: str, value: object) -> None:
+    def __init__(self, key: str, value: object, hash: int = None) -> None:
         """Initialize an entry for use in a hash map."""
         self.key = key
         self.value = value
 
+        # cached result of the hash function for key
+        self.hash = hash
+
         # Set this value to True when you "delete" a HashEntry
         self.is_tombstone = False
 
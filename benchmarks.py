@@ -0,0 +1,876 @@
+# Description: Timing and memory benchmarks for the hash map implementations.
+#              Run every benchmark with `python benchmarks.py`, or pick some
+#              by name, e.g. `python benchmarks.py sc_buckets`.
+
+import gc
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from itertools import islice, permutations
+
+from a6_include import (LinkedList, ArrayBucket, HASH_FUNCTIONS, builtin_hash,
+                        next_prime, hash_function_1, hash_function_2)
+import hash_map_sc
+import hash_map_oa
+import hash_map_wal
+
+
+def _keys(n: int, prefix: str = 'key') -> list:
+    """
+    Return n distinct string keys
+    """
+    return [prefix + str(i) for i in range(n)]
+
+
+def _skewed(n: int, pool: list):
+    """
+    Yield n keys drawn from pool with log-uniform ranks,
+    so a few keys are very frequent and most are rare
+    """
+    rnd = random.Random(0)
+    for _ in range(n):
+        yield pool[int(len(pool) ** rnd.random()) - 1]
+
+
+def _measure(build: callable) -> tuple:
+    """
+    Run build() and return its result with the bytes it left allocated
+    """
+    tracemalloc.start()
+    result = build()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated
+
+
+def _percentiles(samples: list) -> str:
+    """
+    Format p50/p99/max of latency samples given in seconds
+    """
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[len(samples) * 99 // 100]
+    return (f"p50 {p50 * 1e6:7.2f} us  p99 {p99 * 1e6:7.2f} us  "
+            f"max {samples[-1] * 1e3:8.2f} ms")
+
+
+def _time(fn: callable, *args) -> float:
+    """
+    Return seconds taken by fn(*args)
+    """
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def bench_sc_buckets(n: int = 50_000) -> None:
+    """
+    Memory per entry and lookup latency of LinkedList vs ArrayBucket buckets
+    """
+    keys = _keys(n)
+    misses = _keys(n, 'miss')
+
+    def lookups(m, probe):
+        for key in probe:
+            m.get(key)
+
+    for function in (hash_function_1, hash_function_2):
+        for bucket_type in (LinkedList, ArrayBucket):
+            def build():
+                m = hash_map_sc.HashMap(11, function, bucket_type)
+                for key in keys:
+                    m.put(key, 0)
+                return m
+
+            m, allocated = _measure(build)
+            hits = _time(lookups, m, keys) / n * 1e6
+            missed = _time(lookups, m, misses) / n * 1e6
+            print(f"{function.__name__:16} {bucket_type.__name__:12} "
+                  f"{allocated / n:7.1f} B/entry  "
+                  f"hit {hits:6.2f} us  miss {missed:6.2f} us")
+
+
+def bench_oa_storage(n: int = 20_000) -> None:
+    """
+    Memory per entry and probe latency of HashEntry slots vs struct-of-arrays
+    """
+    keys = _keys(n)
+
+    def lookups(m, probe):
+        for key in probe:
+            m.contains_key(key)
+
+    for map_type in (hash_map_oa.HashMap, hash_map_oa.CompactHashMap):
+        def build():
+            m = map_type(11, hash_function_2)
+            for key in keys:
+                m.put(key, 0)
+            return m
+
+        m, allocated = _measure(build)
+        hits = _time(lookups, m, keys) / n * 1e6
+        print(f"{map_type.__name__:16} {allocated / n:7.1f} B/entry  "
+              f"hit {hits:6.2f} us")
+
+
+def bench_resize_latency(n: int = 200_000, step: int = 4) -> None:
+    """
+    Per-put latency while growing from empty, stop-the-world vs incremental
+    """
+    keys = _keys(n)
+    clock = time.perf_counter
+
+    for name, make in (
+            ('SC', lambda s: hash_map_sc.HashMap(11, hash, LinkedList, s)),
+            ('OA', lambda s: hash_map_oa.HashMap(11, hash, s))):
+        for migrate_step in (0, step):
+            m = make(migrate_step)
+            samples = []
+
+            # collector pauses would otherwise dominate the max
+            gc.collect()
+            gc.disable()
+            for key in keys:
+                start = clock()
+                m.put(key, 0)
+                samples.append(clock() - start)
+            gc.enable()
+
+            mode = f"step {migrate_step}" if migrate_step else "all at once"
+            print(f"{name} {mode:12} {_percentiles(samples)}")
+
+
+def bench_bulk_ops(n: int = 50_000) -> None:
+    """
+    Per-key put/contains_key loops vs put_many/contains_many
+    """
+    rnd = random.Random(0)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789'
+    keys = [''.join(rnd.choice(alphabet) for _ in range(30)) for _ in range(n)]
+    values = list(range(n))
+
+    def put_loop(m):
+        for key, value in zip(keys, values):
+            m.put(key, value)
+
+    def contains_loop(m):
+        for key in keys:
+            m.contains_key(key)
+
+    for make in (lambda: hash_map_sc.HashMap(11, hash_function_2),
+                 lambda: hash_map_oa.HashMap(11, hash_function_2),
+                 lambda: hash_map_oa.CompactHashMap(11, hash_function_2)):
+        looped, bulk = make(), make()
+        put = _time(put_loop, looped), _time(bulk.put_many, keys, values)
+        contains = _time(contains_loop, looped), _time(bulk.contains_many, keys)
+        print(f"{type(looped).__module__:12} {type(looped).__name__:15} "
+              f"put {put[0]:6.2f} s -> {put[1]:6.2f} s  "
+              f"contains {contains[0]:6.2f} s -> {contains[1]:6.2f} s")
+
+
+def bench_hash_quality(n: int = 20_000) -> None:
+    """
+    Bucket distribution of every registered hash function on sample keys
+    Capacity is the first prime >= n, so a perfect function averages 1 per bucket
+    """
+    capacity = hash_map_sc.HashMap(n).get_capacity()
+    samples = {
+        'sequential': _keys(n),
+        'anagrams': ['key' + ''.join(digits) for digits
+                     in islice(permutations('0123456789', 6), n)],
+        'uuid-like': [f"{i * 2654435761 % 16 ** 8:08x}-{i:04x}" for i in range(n)],
+    }
+
+    for sample, keys in samples.items():
+        print(sample)
+        for name, function in HASH_FUNCTIONS.items():
+            counts = [0] * capacity
+            elapsed = _time(lambda: [function(key) for key in keys])
+            for key in keys:
+                counts[function(key) % capacity] += 1
+
+            mean = n / capacity
+            variance = sum((count - mean) ** 2 for count in counts) / capacity
+            print(f"  {name:16} variance {variance:9.2f}  max chain {max(counts):6}  "
+                  f"empty {counts.count(0) / capacity:5.1%}  "
+                  f"{elapsed / n * 1e6:5.2f} us/hash")
+
+
+def bench_robin_hood(n: int = 50_000) -> None:
+    """
+    Hit/miss latency and probe lengths of Robin Hood hashing at high load
+    against the quadratic probing CompactHashMap capped at 0.5
+    """
+    keys = _keys(n)
+    misses = _keys(n, 'miss')
+
+    def lookups(m, probe):
+        for key in probe:
+            m.contains_key(key)
+
+    maps = [('quadratic 0.5', hash_map_oa.CompactHashMap(11, builtin_hash))]
+    for max_load in (0.5, 0.75, 0.9):
+        maps.append((f"robin hood {max_load}",
+                     hash_map_oa.RobinHoodHashMap(11, builtin_hash, max_load)))
+
+    for name, m in maps:
+        m.put_many(keys, [0] * n)
+        hits = _time(lookups, m, keys) / n * 1e6
+        missed = _time(lookups, m, misses) / n * 1e6
+        line = (f"{name:16} load {m.table_load():4.2f}  "
+                f"hit {hits:5.2f} us  miss {missed:5.2f} us")
+
+        if isinstance(m, hash_map_oa.RobinHoodHashMap):
+            distances = [m._distance(entry, index) for index in range(m.get_capacity())
+                         if (entry := m._buckets[index]) is not None]
+            line += (f"  probes mean {1 + sum(distances) / n:4.2f} "
+                     f"max {1 + max(distances)}")
+        print(line)
+
+
+def bench_churn(n: int = 20_000, rounds: int = 8) -> None:
+    """
+    Hit latency under constant insert/delete with a fixed number of live keys
+    Each round inserts n fresh keys and removes the n oldest ones
+    """
+    sample = 2_000
+
+    def lookups(m, keys):
+        for key in keys:
+            m.contains_key(key)
+
+    for map_type in (hash_map_oa.HashMap, hash_map_oa.CompactHashMap):
+        m = map_type(11, builtin_hash)
+        m.put_many(_keys(n), [0] * n)
+        print(map_type.__name__)
+
+        for round_number in range(1, rounds + 1):
+            for i in range(round_number * n, (round_number + 1) * n):
+                m.put('key' + str(i), 0)
+                m.remove('key' + str(i - n))
+
+            live = ['key' + str(round_number * n + i) for i in range(sample)]
+            hits = _time(lookups, m, live) / sample * 1e6
+            print(f"  round {round_number}  hit {hits:5.2f} us  "
+                  f"capacity {m.get_capacity():7}  probe load {m.probe_load():4.2f}")
+
+
+def bench_misses(capacity: int = 1_000_000, n: int = 20_000) -> None:
+    """
+    Miss latency as the table grows to capacity slots at fixed load factors
+    Lookups stop at the first never used slot, so a miss should cost the
+    same on a 1M-slot table as on a 10k-slot one
+    """
+    misses = _keys(n, 'miss')
+
+    def lookups(m, probe):
+        for key in probe:
+            m.contains_key(key)
+
+    for load in (0.1, 0.25, 0.45):
+        for slots in (capacity // 100, capacity // 10, capacity):
+            m = hash_map_oa.HashMap(slots, builtin_hash)
+            count = int(m.get_capacity() * load)
+            m.put_many(_keys(count), [0] * count)
+            missed = _time(lookups, m, misses) / n * 1e6
+            print(f"load {m.table_load():4.2f}  capacity {m.get_capacity():8}  "
+                  f"miss {missed:5.2f} us")
+
+
+def bench_power_of_two(n: int = 100_000) -> None:
+    """
+    Build time and hit/miss latency of prime vs power-of-two capacities
+    Building from capacity 11 includes every resize and its capacity search
+    """
+    keys = _keys(n)
+    misses = _keys(n, 'miss')
+
+    def build(m):
+        for key in keys:
+            m.put(key, 0)
+
+    def lookups(m, probe):
+        for key in probe:
+            m.contains_key(key)
+
+    for map_type in (hash_map_sc.HashMap, hash_map_oa.HashMap,
+                     hash_map_oa.CompactHashMap):
+        for power_of_two in (False, True):
+            m = map_type(11, builtin_hash, power_of_two=power_of_two)
+            built = _time(build, m)
+            hits = _time(lookups, m, keys) / n * 1e6
+            missed = _time(lookups, m, misses) / n * 1e6
+            mode = 'power of two' if power_of_two else 'prime'
+            print(f"{map_type.__module__:12} {map_type.__name__:15} {mode:12} "
+                  f"capacity {m.get_capacity():7}  build {built:5.2f} s  "
+                  f"hit {hits:5.2f} us  miss {missed:5.2f} us")
+
+
+def bench_capacities(n: int = 50_000) -> None:
+    """
+    Cost of picking prime capacities, of construction and clear() at large
+    capacities, and the capacities both maps grow through from the default
+    """
+    for capacity in (1_000, 100_000, 1_000_000, 100_000_000):
+        lookup = _time(lambda: [next_prime(capacity + i) for i in range(100)]) / 100
+        print(f"next_prime({capacity:>11})  {lookup * 1e6:6.2f} us")
+
+    for capacity in (1_000, 100_000, 1_000_000):
+        for map_type in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+            built = _time(lambda: map_type(capacity, builtin_hash))
+            m = map_type(capacity, builtin_hash)
+            cleared = _time(m.clear)
+            print(f"{map_type.__module__:12} capacity {capacity:8}  "
+                  f"construct {built * 1e3:7.2f} ms  clear {cleared * 1e3:7.2f} ms")
+
+    for map_type in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        m = map_type(11, builtin_hash)
+        capacities = [m.get_capacity()]
+        for key in _keys(n):
+            m.put(key, 0)
+            if m.get_capacity() != capacities[-1]:
+                capacities.append(m.get_capacity())
+        print(f"{map_type.__module__:12} grows {' '.join(map(str, capacities))}")
+
+
+def bench_stats(capacity: int = 1_000_000, n: int = 100_000) -> None:
+    """
+    Cost of the monitoring calls empty_buckets() and stats() on large tables
+    """
+    keys = _keys(n)
+    for map_type in (hash_map_sc.HashMap, hash_map_oa.HashMap,
+                     hash_map_oa.CompactHashMap):
+        m = map_type(capacity, builtin_hash)
+        m.put_many(keys, [0] * n)
+        m.remove_many(keys[::2])
+        empty = _time(m.empty_buckets)
+        stats = _time(m.stats)
+        print(f"{map_type.__module__:12} {map_type.__name__:15} "
+              f"capacity {m.get_capacity():8}  empty_buckets {empty * 1e6:8.2f} us  "
+              f"stats {stats * 1e6:6.2f} us")
+        print(f"  {m.stats()}")
+
+
+def bench_iteration(n: int = 200_000) -> None:
+    """
+    Peak extra memory and time of a full scan, get_keys_and_values()
+    against the lazy items() iterator
+    """
+    keys = _keys(n)
+
+    def copied(m):
+        pairs = m.get_keys_and_values()
+        for ind in range(pairs.length()):
+            pairs[ind]
+
+    def streamed(m):
+        for _ in m.items():
+            pass
+
+    for map_type in (hash_map_sc.HashMap, hash_map_oa.HashMap,
+                     hash_map_oa.CompactHashMap):
+        m = map_type(11, builtin_hash)
+        m.put_many(keys, [0] * n)
+
+        for name, scan in (('get_keys_and_values', copied), ('items', streamed)):
+            tracemalloc.start()
+            elapsed = _time(scan, m)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{map_type.__module__:12} {map_type.__name__:15} {name:20} "
+                  f"peak {peak / 1024:9.1f} KiB  {elapsed:5.2f} s")
+
+
+def bench_heavy_hitters(n: int = 10_000_000, cardinality: int = 1_000_000,
+                        counters: int = 1_000) -> None:
+    """
+    Memory and throughput of exact find_mode against the bounded-memory
+    find_mode_stream on a skewed stream of n keys
+    Memory is the peak traced during a separate run of each
+    """
+    pool = _keys(cardinality, 'event')
+    da = hash_map_sc.DynamicArray(list(_skewed(n, pool)))
+    runs = (
+        ('find_mode', lambda: hash_map_sc.find_mode(da, builtin_hash) + (0,)),
+        (f"find_mode_stream {counters}",
+         lambda: hash_map_sc.find_mode_stream(_skewed(n, pool),
+                                              counters, builtin_hash)),
+    )
+
+    for name, run in runs:
+        start = time.perf_counter()
+        modes, frequency, error = run()
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{name:22} mode {modes[0]} x {frequency} error {error}  "
+              f"peak {peak / 2 ** 20:7.1f} MiB  {n / elapsed / 1e6:5.2f} M keys/s")
+
+
+def bench_parallel_mode(n: int = 10_000_000, cardinality: int = 1_000_000) -> None:
+    """
+    Throughput of find_mode against find_mode_parallel with growing pools
+    """
+    da = hash_map_sc.DynamicArray(list(_skewed(n, _keys(cardinality, 'event'))))
+    cpus = os.cpu_count() or 1
+    runs = [('find_mode', lambda: hash_map_sc.find_mode(da, builtin_hash))]
+    for processes in sorted({2, 4, cpus}):
+        runs.append((f"parallel {processes}",
+                     lambda p=processes: hash_map_sc.find_mode_parallel(da, p)))
+
+    print(f"{cpus} CPUs")
+    for name, run in runs:
+        start = time.perf_counter()
+        modes, frequency = run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:12} mode {modes[0]} x {frequency}  {elapsed:6.2f} s  "
+              f"{n / elapsed / 1e6:5.2f} M keys/s")
+
+
+def bench_counting(n: int = 500_000, cardinality: int = 50_000) -> None:
+    """
+    Counting keys with contains_key/get/put, as find_mode used to,
+    vs a single increment per key
+    """
+    keys = list(_skewed(n, _keys(cardinality, 'event')))
+
+    def lookup_loop(m):
+        for key in keys:
+            if m.contains_key(key):
+                m.put(key, m.get(key) + 1)
+            else:
+                m.put(key, 1)
+
+    def increment_loop(m):
+        for key in keys:
+            m.increment(key)
+
+    for make in (lambda: hash_map_sc.HashMap(11, builtin_hash),
+                 lambda: hash_map_oa.HashMap(11, builtin_hash),
+                 lambda: hash_map_oa.CompactHashMap(11, builtin_hash),
+                 lambda: hash_map_oa.RobinHoodHashMap(11, builtin_hash)):
+        looped, incremented = make(), make()
+        before = _time(lookup_loop, looped)
+        after = _time(increment_loop, incremented)
+        print(f"{type(looped).__module__:12} {type(looped).__name__:17} "
+              f"{before:6.2f} s -> {after:6.2f} s  x{before / after:4.2f}")
+
+
+class _LockedHashMap:
+    """
+    Single-lock baseline: a HashMap whose every call holds the same lock
+    """
+
+    def __init__(self, *args) -> None:
+        self._map = hash_map_sc.HashMap(*args)
+        self._lock = threading.Lock()
+
+    def put(self, key: str, value: object) -> None:
+        with self._lock:
+            self._map.put(key, value)
+
+    def get(self, key: str):
+        with self._lock:
+            return self._map.get(key)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._map.remove(key)
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        with self._lock:
+            return self._map.increment(key, delta)
+
+    def get_size(self) -> int:
+        with self._lock:
+            return self._map.get_size()
+
+    def resize_table(self, new_capacity: int) -> None:
+        with self._lock:
+            self._map.resize_table(new_capacity)
+
+    def get_keys_and_values(self):
+        with self._lock:
+            return self._map.get_keys_and_values()
+
+
+def bench_concurrent(threads: int = 4, n: int = 50_000,
+                     switch_interval: float = 1e-5) -> None:
+    """
+    Throughput of threads sharing a HashMap behind one lock vs a
+    ConcurrentHashMap, doubling as a stress test: every thread counts
+    shared keys and puts, reads back and removes keys of its own while
+    another thread keeps calling get_size and resize_table; afterwards
+    no increment may be lost and no private key left behind
+    """
+    pool = _keys(5_000, 'event')
+    streams = [list(islice(_skewed(n * (t + 1), pool), n * t, None))
+               for t in range(threads)]
+
+    def work(m, t, errors):
+        for i, key in enumerate(streams[t]):
+            m.increment(key)
+            own = f"thread{t}-{i}"
+            m.put(own, i)
+            if m.get(own) != i:
+                errors.append(own)
+            m.remove(own)
+
+    def monitor(m, done):
+        capacity = 11
+        while not done.wait(0.001):
+            m.get_size()
+            capacity = capacity * 2 if capacity < 20_000 else 11
+            m.resize_table(capacity)
+
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(switch_interval)
+    try:
+        for name, make in (
+                ('single lock', lambda: _LockedHashMap(11, builtin_hash)),
+                *((f"{stripes} stripes",
+                   lambda s=stripes: hash_map_sc.ConcurrentHashMap(
+                       11, builtin_hash, s)) for stripes in (4, 16, 64))):
+            m, errors, done = make(), [], threading.Event()
+            workers = [threading.Thread(target=work, args=(m, t, errors))
+                       for t in range(threads)]
+            watcher = threading.Thread(target=monitor, args=(m, done))
+
+            start = time.perf_counter()
+            watcher.start()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            done.set()
+            watcher.join()
+
+            counted = m.get_keys_and_values()
+            total = sum(counted.get_at_index(ind)[1]
+                        for ind in range(counted.length()))
+            expected = len({key for stream in streams for key in stream})
+            consistent = (not errors and total == threads * n
+                          and m.get_size() == counted.length() == expected)
+            print(f"{name:12} {threads * n * 4 / elapsed / 1e3:7.1f} k ops/s  "
+                  f"{'consistent' if consistent else 'INCONSISTENT'}")
+            assert consistent, (f"{name}: {len(errors)} private keys misread, "
+                                f"{total} of {threads * n} increments, "
+                                f"size {m.get_size()} of {expected}")
+    finally:
+        sys.setswitchinterval(old_interval)
+
+
+def _shared_reader(task: tuple) -> tuple:
+    """
+    Worker of bench_shared_map: attaches to the shared map, or builds a
+    private copy when name is None, then reads every key once
+    """
+    name, n = task
+    keys = _keys(n, 'user')
+
+    start = time.perf_counter()
+    if name is None:
+        m = hash_map_oa.CompactHashMap(2 * n, 'fnv1a')
+        m.put_many(keys, list(range(n)))
+    else:
+        m = hash_map_oa.SharedHashMap.attach(name)
+    ready = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        m.get(key)
+    reading = time.perf_counter() - start
+
+    if name is not None:
+        m.close()
+    return ready, n / reading
+
+
+def bench_shared_map(n: int = 100_000) -> None:
+    """
+    Worker processes each building the same CompactHashMap vs attaching
+    to one SharedHashMap: time until the map is usable, read throughput
+    per process and memory of the table
+    """
+    keys = _keys(n, 'user')
+
+    def build():
+        private = hash_map_oa.CompactHashMap(2 * n, 'fnv1a')
+        private.put_many(keys, list(range(n)))
+        return private
+
+    _, allocated = _measure(build)
+    shared = hash_map_oa.SharedHashMap(2 * n, 'fnv1a', key_width=16,
+                                       overflow_size=0)
+    try:
+        shared.put_many(keys, list(range(n)))
+        print(f"private table ~{allocated / 2**20:6.1f} MiB per process, "
+              f"shared block {shared._shm.size / 2**20:6.1f} MiB in total")
+
+        context = multiprocessing.get_context('spawn')
+        for processes in (1, 2, 4):
+            for name in (None, shared.get_name()):
+                with context.Pool(processes) as pool:
+                    results = pool.map(_shared_reader, [(name, n)] * processes)
+                ready = max(result[0] for result in results)
+                rate = sum(result[1] for result in results) / processes
+                print(f"{'attach' if name else 'rebuild':7} {processes} processes  "
+                      f"ready {ready * 1e3:8.2f} ms  "
+                      f"{rate / 1e3:6.1f} k reads/s per process")
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def bench_mapped_map(n: int = 200_000, lookups: int = 20_000) -> None:
+    """
+    Rebuilding a CompactHashMap from source data on start vs reopening
+    a MappedHashMap file: time until the first lookup is answered and
+    lookup throughput right after
+    """
+    keys = _keys(n, 'user')
+    sample = random.Random(0).sample(keys, lookups)
+    path = os.path.join(tempfile.mkdtemp(), 'users.map')
+
+    def lookup_rate(m):
+        return lookups / _time(lambda: [m.get(key) for key in sample])
+
+    def rebuild():
+        m = hash_map_oa.CompactHashMap(2 * n, 'fnv1a')
+        m.put_many(keys, list(range(n)))
+        m.get(keys[0])
+        return m
+
+    start = time.perf_counter()
+    private = rebuild()
+    print(f"rebuild  first lookup after {(time.perf_counter() - start) * 1e3:8.2f} ms  "
+          f"{lookup_rate(private) / 1e3:6.1f} k gets/s")
+
+    def write():
+        with hash_map_oa.MappedHashMap(path, 2 * n, 'fnv1a', key_width=16) as m:
+            m.put_many(keys, list(range(n)))
+
+    try:
+        written = _time(write)
+        start = time.perf_counter()
+        mapped = hash_map_oa.MappedHashMap(path)
+        mapped.get(keys[0])
+        print(f"reopen   first lookup after {(time.perf_counter() - start) * 1e3:8.2f} ms  "
+              f"{lookup_rate(mapped) / 1e3:6.1f} k gets/s  "
+              f"(file of {os.path.getsize(path) / 2**20:.1f} MiB written in {written:.2f} s)")
+        mapped.close()
+    finally:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+def bench_snapshot(n: int = 10_000_000) -> None:
+    """
+    Loading a dump() snapshot vs rebuilding the map by putting the pairs
+    of get_keys_and_values() into a new one
+    """
+    keys = _keys(n, 'user')
+    values = list(range(n))
+    path = os.path.join(tempfile.mkdtemp(), 'map.snapshot')
+
+    try:
+        for cls in (hash_map_sc.HashMap, hash_map_oa.HashMap,
+                    hash_map_oa.CompactHashMap):
+            def rebuild():
+                m = cls(11, 'builtin')
+                m.put_many(keys, values)
+                return m
+
+            start = time.perf_counter()
+            m = rebuild()
+            rebuilt = time.perf_counter() - start
+
+            with open(path, 'wb') as file:
+                dumped = _time(m.dump, file)
+            del m
+            gc.collect()
+
+            with open(path, 'rb') as file:
+                start = time.perf_counter()
+                m = cls.load(file)
+                loaded = time.perf_counter() - start
+            del m
+            gc.collect()
+
+            print(f"{cls.__module__:12} {cls.__name__:15} rebuild {rebuilt:6.2f} s  "
+                  f"load {loaded:6.2f} s  x{rebuilt / loaded:4.1f}  "
+                  f"(dump {dumped:5.2f} s, {os.path.getsize(path) / 2**20:6.1f} MiB)")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+def bench_wal(n: int = 200_000) -> None:
+    """
+    Sustained put rate of DurableHashMap with an fsync per change and with
+    group commit, against the in-memory map, then the time to recover it
+    """
+    keys = _keys(n, 'user')
+    directory = tempfile.mkdtemp()
+
+    def run(m, count):
+        start = time.perf_counter()
+        for i in range(count):
+            m.put(keys[i], i)
+        return count / (time.perf_counter() - start)
+
+    try:
+        memory = run(hash_map_sc.HashMap(11, 'fnv1a'), n)
+        print(f"in-memory HashMap                        {memory:10,.0f} puts/s")
+
+        # an fsync per put is far slower, so it only gets a slice of the keys
+        for label, count, options in (
+                ("fsync every put", n // 50, dict(sync_interval=0)),
+                ("group commit, batch 100", n, dict(batch_size=100)),
+                ("group commit, batch 1000", n, dict(batch_size=1000)),
+                ("group commit, batch 1000, compacting", n,
+                 dict(batch_size=1000, compact_size=4 << 20))):
+            shutil.rmtree(directory)
+            with hash_map_wal.DurableHashMap(directory, **options) as m:
+                rate = run(m, count)
+            print(f"{label:40} {rate:10,.0f} puts/s  x{memory / rate:6.1f} slower")
+
+        start = time.perf_counter()
+        m = hash_map_wal.DurableHashMap(directory)
+        recovered = time.perf_counter() - start
+        print(f"recover {m.get_size():,} keys from snapshot + log  {recovered:6.2f} s")
+        m.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_cache(maxsize: int = 10_000, n: int = 500_000) -> None:
+    """
+    Hit-path cost of CacheHashMap.get and of a memoize'd function against
+    a raw HashMap.get of the same keys, then hit rate and evictions of
+    both policies on a skewed stream larger than the cache
+    """
+    keys = _keys(maxsize)
+    lookups = [keys[i % maxsize] for i in range(n)]
+    random.Random(7).shuffle(lookups)
+
+    raw = hash_map_sc.HashMap(maxsize, 'builtin')
+    raw.put_many(keys, range(maxsize))
+    base = _time(lambda: [raw.get(key) for key in lookups])
+    print(f"HashMap.get           {base / n * 1e9:7.0f} ns/hit")
+
+    for policy in ('lru', 'lfu'):
+        cache = hash_map_sc.CacheHashMap(maxsize, policy)
+        for i, key in enumerate(keys):
+            cache.put(key, i)
+        elapsed = _time(lambda: [cache.get(key) for key in lookups])
+        print(f"CacheHashMap.get {policy}  {elapsed / n * 1e9:7.0f} ns/hit  "
+              f"x{elapsed / base:4.2f}")
+
+        @hash_map_sc.memoize(maxsize, policy)
+        def square(key):
+            return key * 2
+        for key in keys:
+            square(key)
+        elapsed = _time(lambda: [square(key) for key in lookups])
+        print(f"memoize {policy}           {elapsed / n * 1e9:7.0f} ns/hit  "
+              f"x{elapsed / base:4.2f}")
+
+    pool = _keys(maxsize * 10)
+    stream = list(_skewed(n, pool))
+    for policy in ('lru', 'lfu'):
+        cache = hash_map_sc.CacheHashMap(maxsize // 10, policy)
+        for key in stream:
+            if cache.get(key) is None:
+                cache.put(key, True)
+        stats = cache.stats()
+        print(f"skewed stream, {policy}  hit rate {stats['hit_rate']:6.1%}  "
+              f"evictions {stats['evictions']:,}")
+
+
+def bench_expiry(n: int = 200_000, ticks: int = 50, step: int = 256) -> None:
+    """
+    Removing expired keys by scanning get_keys_and_values() of a HashMap
+    of (value, deadline) pairs on every tick vs ExpiringHashMap.sweep(),
+    with deadlines spread so that 1% of the keys expire per tick
+    """
+    keys = _keys(n, 'session')
+    now = [0.0]
+    plain = hash_map_sc.HashMap(n, 'builtin')
+    expiring = hash_map_sc.ExpiringHashMap(n, 'builtin', sweep_step=0,
+                                           clock=lambda: now[0])
+    for i, key in enumerate(keys):
+        ttl = 1 + i * 100 // n
+        plain.put(key, (i, ttl))
+        expiring.put(key, i, ttl)
+
+    scans, sweeps, steps = [], [], []
+    for tick in range(1, ticks + 1):
+        now[0] = tick
+
+        start = time.perf_counter()
+        pairs = plain.get_keys_and_values()
+        for i in range(pairs.length()):
+            key, (value, deadline) = pairs[i]
+            if deadline <= tick:
+                plain.remove(key)
+        scans.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        removed = 1
+        while removed:
+            step_start = time.perf_counter()
+            removed = expiring.sweep(step)
+            steps.append(time.perf_counter() - step_start)
+        sweeps.append(time.perf_counter() - start)
+
+    assert plain.get_size() == expiring.get_size()
+    print(f"scan per tick     {_percentiles(scans)}")
+    print(f"sweep per tick    {_percentiles(sweeps)}")
+    print(f"sweep({step}) step  {_percentiles(steps)}")
+
+
+BENCHMARKS = {
+    'sc_buckets': bench_sc_buckets,
+    'oa_storage': bench_oa_storage,
+    'resize_latency': bench_resize_latency,
+    'bulk_ops': bench_bulk_ops,
+    'hash_quality': bench_hash_quality,
+    'robin_hood': bench_robin_hood,
+    'churn': bench_churn,
+    'misses': bench_misses,
+    'power_of_two': bench_power_of_two,
+    'capacities': bench_capacities,
+    'stats': bench_stats,
+    'iteration': bench_iteration,
+    'heavy_hitters': bench_heavy_hitters,
+    'parallel_mode': bench_parallel_mode,
+    'counting': bench_counting,
+    'concurrent': bench_concurrent,
+    'shared_map': bench_shared_map,
+    'mapped_map': bench_mapped_map,
+    'snapshot': bench_snapshot,
+    'wal': bench_wal,
+    'cache': bench_cache,
+    'expiry': bench_expiry,
+}
+
+
+if __name__ == "__main__":
+
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"\n{name}")
+        print("-" * len(name))
+        BENCHMARKS[name]()
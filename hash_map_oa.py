@@ -1,25 +1,84 @@
 # By Milton Molina
 
-from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
+import mmap
+import os
+import pickle
+import struct
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_batch, get_hash_function, mix_hash,
+                        is_prime, next_prime, pack_hashes, paused_gc,
+                        write_snapshot, read_snapshot,
                         hash_function_1, hash_function_2)
 
+# cached hashes are stored as unsigned 64-bit integers
+_HASH_MASK = (1 << 64) - 1
+
+
+def _unchanged(value: object) -> object:
+    """
+    Update function of setdefault, keeping the value it is given
+    """
+    return value
+
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    # layout name recorded by dump() and checked by load()
+    _SNAPSHOT_KIND = 'open addressing'
+
+    def __init__(self, capacity: int, function, migrate_step: int = 0,
+                 tombstone_limit: float = 0.25,
+                 power_of_two: bool = False) -> None:
         """
         Initialize new HashMap that uses
         quadratic probing for collision resolution
-        """
-        self._buckets = DynamicArray()
 
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        function is a hash function or the name it is registered under
+        in a6_include.HASH_FUNCTIONS
+
+        migrate_step enables incremental resizing: the old table is kept
+        after a resize and every put/get/contains_key/remove moves at least
+        migrate_step of its slots into the new one, more when that would not
+        empty it before the next resize. 0 rehashes all at once
 
-        self._hash_function = function
+        tombstone_limit is the fraction of the capacity that may hold
+        tombstones before the table is rebuilt at the same capacity
+
+        power_of_two rounds capacities up to powers of two instead of primes,
+        indexes by masking a mixed hash and probes with triangular numbers
+        """
+        # capacity must be a prime number, or a power of two if requested
+        self._power_of_two = power_of_two
+        self._capacity = self._next_capacity(capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
+
+        self._hash_function = get_hash_function(function)
         self._size = 0
 
+        # table grows once the load factor reaches this threshold
+        self._max_load = 0.5
+
+        # removed entries still occupying a slot, tracked apart from _size
+        self._tombstone_count = 0
+        self._tombstone_limit = tombstone_limit
+
+        # number of live entries in the current table by how many
+        # probe steps past their home slot they sit, kept for stats()
+        self._probe_lengths = []
+
+        # bumped whenever keys are added or removed or the table is rebuilt,
+        # so iterators can tell the map changed under them
+        self._version = 0
+
+        # old table still being drained by an incremental resize, and the
+        # slots every operation moves out of it
+        self._migrate_step = migrate_step
+        self._migrate_batch = migrate_step
+        self._old_buckets = None
+        self._migrated = 0
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
@@ -32,34 +91,17 @@ class HashMap:
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number to find the closest prime number
+        Find the closest prime number at or above the given number
+        Looked up in the prime table shared with the other HashMap
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
         Determine if given integer is a prime number and return boolean
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        return is_prime(capacity)
 
     def get_size(self) -> int:
         """
@@ -83,45 +125,85 @@ class HashMap:
        Replaces value if key exists
        Adds new key/value pair when key not in hash map
         """
+        # computes value based on key
+        self._put(key, value, self._hash_function(key))
+
+    def _put(self, key: str, value: object, hash_result: int) -> None:
+        """
+        Same as put, for a key whose hash has already been computed
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_batch)
+
         # if table load greater than 0.5, need to resize table
-        if self.table_load() >= 0.50:
-            self.resize_table(self._capacity * 2)
+        self._check_load()
 
-        # computes value based on key
-        hash_result = self._hash_function(key)
+        # an entry still waiting in the old table is replaced by a new one
+        if self._old_buckets is not None:
+            self._take_old_entry(key, hash_result)
 
-        # uses mod to assign value to an index in the array
-        hash_index = hash_result % self._capacity
+        index, free, distance = self._probe(key, hash_result)
 
-        # get key/value at index and save to variable
-        bucket = self._buckets.get_at_index(hash_index)
+        # when key matches, replace the value
+        if index >= 0:
+            self._buckets.get_at_index(index).value = value
+            return
 
-        # save entry (tuple) as a variable
-        pair = HashEntry(key, value)
+        # otherwise fill the first empty slot or tombstone in the sequence
+        self._insert(free, key, value, hash_result, distance)
 
-        # typically initial insert
-        # or if empty or a tombstone, fill in with new HashEntry
-        if bucket is None or bucket.is_tombstone:
-            self._buckets.set_at_index(hash_index, pair)
-            self._size += 1
+    def _insert(self, free: int, key: str, value: object, hash_result: int,
+                distance: int) -> None:
+        """
+        Stores a key _probe found absent in the reusable slot free,
+        distance probe steps past its home slot
+        """
+        if self._buckets.get_at_index(free) is not None:
+            self._tombstone_count -= 1
+        self._buckets.set_at_index(free, HashEntry(key, value, hash_result))
+        self._size += 1
+        self._version += 1
+        self._count_probe(distance)
+
+    def _probe(self, key: str, hash_result: int) -> tuple[int, int, int]:
+        """
+        Probe for key starting at its home slot, shared by
+        put, get, contains_key and remove
 
-        else:
-            # search for empty position using quadratic probing
-            for ind in range(self._buckets.length()):
-                quad = hash_index + ind ** 2
-                index = quad % self._capacity
-                bucket = self._buckets.get_at_index(index)
+        :returns: A tuple of the index holding the key (-1 if absent),
+                  the first reusable slot seen (-1 if the table is full)
+                  and how many steps past home the key's slot is, or the
+                  reusable slot's when the key is absent
+        """
+        buckets, capacity = self._buckets, self._capacity
+        mask = capacity - 1 if self._power_of_two else 0
+        index = mix_hash(hash_result) & mask if mask else hash_result % capacity
+        free = free_step = -1
 
-                # take tombstones into account
-                if bucket is None or bucket.is_tombstone:
-                    self._buckets.set_at_index(index, pair)
-                    self._size += 1
-                    return
+        # same sequence as _slots, stepped inline to keep the hot path cheap
+        for step in range(1, capacity + 1):
+            bucket = buckets.get_at_index(index)
+
+            # a never used slot ends the probe sequence
+            if bucket is None:
+                if free < 0:
+                    return -1, index, step - 1
+                return -1, free, free_step - 1
+
+            if bucket.is_tombstone:
+                if free < 0:
+                    free, free_step = index, step
+
+            # compare cached hashes before comparing keys
+            elif bucket.hash == hash_result and bucket.key == key:
+                return index, free, step - 1
 
-                # when key matches, replace the value
-                elif bucket.key == key:
-                    bucket.value = value
-                    return
+            if mask:
+                index = (index + step) & mask
+            else:
+                index = (index + 2 * step - 1) % capacity
+
+        return -1, free, free_step - 1
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -131,26 +213,144 @@ class HashMap:
         if new_capacity < self._size:
             return
 
+        self._finish_migration()
+
         # if new capacity not a prime, change it to next highest prime number
-        if not self._is_prime(new_capacity):
-            new_capacity = self._next_prime(new_capacity)
+        # (or power of two)
+        if self._power_of_two or not self._is_prime(new_capacity):
+            new_capacity = self._next_capacity(new_capacity)
 
-        # create with hashmap with new capacity
-        new_da = HashMap(new_capacity, self._hash_function)
+        # grow again if load factor would reach the allowed threshold
+        while self._size / new_capacity >= self._max_load:
+            new_capacity = self._next_capacity(new_capacity * 2)
 
-        # copy over active elements to new hash map
-        for ind in range(self._buckets.length()):
-            bucket = self._buckets.get_at_index(ind)
-            if bucket is not None and not bucket.is_tombstone:
-                new_da.put(bucket.key, bucket.value)
+        self._rehash(new_capacity)
+
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Swaps in a new table of exactly new_capacity and moves every live
+        HashEntry into it, or only starts doing so in incremental mode
+        """
+        self._old_buckets = self._buckets
+        self._migrated = 0
 
         # set new references
-        self._buckets = new_da._buckets
+        self._buckets = DynamicArray([None] * new_capacity)
         self._capacity = new_capacity
+        self._tombstone_count = 0
+        self._probe_lengths = []
+        self._version += 1
+
+        if not self._migrate_step:
+            self._finish_migration()
+            return
+
+        # move enough slots per operation to drain the old table before
+        # the inserts the new one has room for run out, since the next
+        # resize has to move whatever is left all at once
+        headroom = max(int(self._max_load * new_capacity) - self._size, 1)
+        self._migrate_batch = max(self._migrate_step,
+                                  -(-self._old_buckets.length() // headroom))
+
+    def _migrate(self, count: int) -> None:
+        """
+        Moves the live entries of the next count slots of the old table
+        Entries are probed into place using their cached hash, without
+        comparing keys or checking the load factor; tombstones are dropped
+        """
+        old_buckets, buckets = self._old_buckets, self._buckets
+        stop = min(self._migrated + count, old_buckets.length())
+        capacity = self._capacity
+        mask = capacity - 1 if self._power_of_two else 0
+
+        for ind in range(self._migrated, stop):
+            entry = old_buckets.get_at_index(ind)
+            if entry is None or entry.is_tombstone:
+                continue
+
+            # first empty slot or tombstone of the probe sequence
+            index = mix_hash(entry.hash) & mask if mask else entry.hash % capacity
+            for step in range(1, capacity + 1):
+                bucket = buckets.get_at_index(index)
+                if bucket is None or bucket.is_tombstone:
+                    if bucket is not None:
+                        self._tombstone_count -= 1
+                    buckets.set_at_index(index, entry)
+                    self._count_probe(step - 1)
+                    break
+
+                if mask:
+                    index = (index + step) & mask
+                else:
+                    index = (index + 2 * step - 1) % capacity
+
+        # migrated slots stay in place so old probe sequences remain intact
+        self._migrated = stop
+        if stop == old_buckets.length():
+            self._old_buckets = None
+
+    def _finish_migration(self) -> None:
+        """
+        Moves whatever is left of the old table into the current one
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_buckets.length())
+
+    def _old_entry(self, key: str, hash_result: int) -> HashEntry:
+        """
+        Returns the live, not yet migrated entry for key in the old table,
+        or None
+        """
+        old_buckets = self._old_buckets
+        for index in self._slots(hash_result, old_buckets.length()):
+            entry = old_buckets.get_at_index(index)
+            if entry is None:
+                return None
+
+            # slots before the migration cursor have already moved
+            if index >= self._migrated and not entry.is_tombstone \
+                    and entry.hash == hash_result and entry.key == key:
+                return entry
 
-        # resize again if load factor becomes greater than allowed threshold
-        if self.table_load() >= 0.5:
-            self._capacity = self._next_prime(self._capacity * 2)
+        return None
+
+    def _take_old_entry(self, key: str, hash_result: int) -> HashEntry:
+        """
+        Removes the not yet migrated entry for key from the old table,
+        leaving a tombstone, and returns it, or None
+        """
+        entry = self._old_entry(key, hash_result)
+        if entry is not None:
+            entry.is_tombstone = True
+            self._size -= 1
+            self._version += 1
+        return entry
+
+    def _next_capacity(self, capacity: int) -> int:
+        """
+        Returns the closest allowed capacity at or above capacity,
+        a power of two in power-of-two mode and a prime otherwise
+        """
+        if self._power_of_two:
+            return 1 << max(capacity - 1, 0).bit_length()
+        return self._next_prime(capacity)
+
+    def _slots(self, hash_result: int, capacity: int):
+        """
+        Yields the probe sequence of a hash in a table of the given capacity
+        Quadratic steps from hash mod a prime capacity, or triangular steps
+        from the masked mixed hash, which visit every slot of a power of two
+        """
+        if self._power_of_two:
+            mask = capacity - 1
+            index = mix_hash(hash_result) & mask
+            for step in range(1, capacity + 1):
+                yield index
+                index = (index + step) & mask
+        else:
+            hash_index = hash_result % capacity
+            for step in range(capacity):
+                yield (hash_index + step * step) % capacity
 
     def table_load(self) -> float:
         """
@@ -158,21 +358,94 @@ class HashMap:
         """
         return self._size / self._capacity
 
+    def probe_load(self) -> float:
+        """
+        Returns fraction of slots that probing has to step over,
+        live entries and tombstones alike
+        """
+        return (self._size + self._tombstone_count) / self._capacity
+
+    def _check_load(self) -> None:
+        """
+        Makes room before an insert once probe load reaches the threshold
+        Doubles the table when live entries account for most of the load,
+        otherwise rebuilds it at the same capacity to drop the tombstones
+        """
+        if self.probe_load() >= self._max_load:
+            if self.table_load() >= self._max_load / 2:
+                self.resize_table(self._capacity * 2)
+            else:
+                self._purge_tombstones()
+
+    def _tombstone_added(self) -> None:
+        """
+        Counts a new tombstone and rebuilds the table at the same capacity
+        once tombstones exceed the allowed fraction of it
+        """
+        self._tombstone_count += 1
+        if self._tombstone_count > self._tombstone_limit * self._capacity:
+            self._purge_tombstones()
+
+    def _purge_tombstones(self) -> None:
+        """
+        Rebuilds the table at its current capacity, dropping all tombstones
+        """
+        self._finish_migration()
+        self._rehash(self._capacity)
+
+    def _count_probe(self, distance: int) -> None:
+        """
+        Records a live entry placed distance probe steps past its home slot
+        """
+        lengths = self._probe_lengths
+        if distance < len(lengths):
+            lengths[distance] += 1
+        else:
+            lengths.extend([0] * (distance - len(lengths)))
+            lengths.append(1)
+
+    def _uncount_probe(self, distance: int) -> None:
+        """
+        Records a live entry leaving a slot distance probe steps past home
+        Trailing zero counts are dropped so the last one is the longest probe
+        """
+        lengths = self._probe_lengths
+        lengths[distance] -= 1
+        while lengths and not lengths[-1]:
+            lengths.pop()
+
     def empty_buckets(self) -> int:
         """
         Returns number of empty buckets in the hash table
+        Answered from the counters, so polling it never finishes a resize;
+        entries an incremental resize has not moved yet count as moved
         """
-        count = 0
+        # every slot not holding a live entry, tombstones included
+        return self._capacity - self._size
 
-        # iterate through array
-        for ind in range(self._buckets.length()):
-            bucket = self._buckets.get_at_index(ind)
-            # check if none or tombstone, inc count if so
-            if bucket is None or bucket.is_tombstone:
-                count += 1
+    def stats(self) -> dict:
+        """
+        Returns occupancy statistics of the current table from counters kept
+        up to date on every change, so no table walk is needed
 
-        # returns # of empty buckets
-        return count
+        empty_buckets is the same count as empty_buckets(), tombstones
+        included; unused_slots leaves them out. occupied_buckets,
+        unused_slots and longest_probe only cover the current table;
+        entries an incremental resize has not moved yet are left out
+        """
+        occupied = sum(self._probe_lengths)
+        return {
+            'size': self._size,
+            'capacity': self._capacity,
+            'table_load': self.table_load(),
+            'probe_load': self.probe_load(),
+            'occupied_buckets': occupied,
+            'tombstones': self._tombstone_count,
+            'empty_buckets': self.empty_buckets(),
+            'unused_slots': self._capacity - occupied - self._tombstone_count,
+            'longest_probe': len(self._probe_lengths),
+            'resizing': self._old_buckets is not None,
+        }
 
     def get(self, key: str) -> object:
         """
@@ -180,31 +453,27 @@ class HashMap:
         If key is not in hash map, return None
         """
         # computes value based on key
-        hash_result = self._hash_function(key)
-
-        # uses mod to assign value to an index in the array
-        hash_index = hash_result % self._capacity
-
-        # get key/value at index and save to variable
-        bucket = self._buckets.get_at_index(hash_index)
+        return self._get(key, self._hash_function(key))
 
-        # when not empty, key matches, and not a tombstone, save value to a variable and return
-        if bucket is not None and bucket.key == key:
-            if bucket.is_tombstone is False:
-                return bucket.value
+    def _get(self, key: str, hash_result: int) -> object:
+        """
+        Same as get, for a key whose hash has already been computed
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_batch)
 
-        # use quadratic probing to search for key
-        for ind in range(hash_index, self._buckets.length()):
-            quad = hash_index + ind ** 2
-            index = quad % self._capacity
-            bucket = self._buckets.get_at_index(index)
+        # key found, return the value
+        index = self._probe(key, hash_result)[0]
+        if index >= 0:
+            return self._buckets.get_at_index(index).value
 
-            # key found, and if not a tombstone, return the value
-            if bucket is not None and bucket.key == key:
-                if bucket.is_tombstone is False:
-                    return bucket.value
+        # key may still be waiting in the old table during a resize
+        if self._old_buckets is not None:
+            entry = self._old_entry(key, hash_result)
+            if entry is not None:
+                return entry.value
 
-        # if loop ends, this means key is not present
+        # key is not present
         return None
 
     def contains_key(self, key: str) -> bool:
@@ -212,31 +481,21 @@ class HashMap:
         Returns True if given key is in the hash map, otherwise returns False
         """
         # computes value based on key
-        hash_result = self._hash_function(key)
-
-        # uses mod to assign value to an index in the array
-        hash_index = hash_result % self._capacity
+        return self._contains_key(key, self._hash_function(key))
 
-        # get key/value at index and save to variable
-        bucket = self._buckets.get_at_index(hash_index)
+    def _contains_key(self, key: str, hash_result: int) -> bool:
+        """
+        Same as contains_key, for a key whose hash has already been computed
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_batch)
 
-        # when not empty, key matches, and not a tombstone, return True
-        # when not empty, key matches, and a tombstone, return False
-        if bucket is not None and bucket.key == key:
-            if bucket.is_tombstone:
-                return False
+        if self._probe(key, hash_result)[0] >= 0:
             return True
 
-        # otherwise, empty and needs quadratic probing
-        for ind in range(self._buckets.length()):
-            quad = hash_index + ind ** 2
-            index = quad % self._capacity
-            bucket = self._buckets.get_at_index(index)
-
-            if bucket is not None and bucket.key == key:
-                if bucket.is_tombstone:
-                    return False
-                return True
+        # key may still be waiting in the old table during a resize
+        if self._old_buckets is not None:
+            return self._old_entry(key, hash_result) is not None
 
         # key not found, return False
         return False
@@ -247,33 +506,143 @@ class HashMap:
         If key not found, does nothing
         """
         # computes value based on key
-        hash_result = self._hash_function(key)
+        self._remove(key, self._hash_function(key))
+
+    def _remove(self, key: str, hash_result: int) -> None:
+        """
+        Same as remove, for a key whose hash has already been computed
+        """
+        self._pop(key, hash_result)
 
-        # uses mod to assign value to an index in the array
-        hash_index = hash_result % self._capacity
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes given key from the hash map and returns its value
+        If key not found, returns default
+        """
+        return self._pop(key, self._hash_function(key), default)
 
-        # get key/value(HashEntry) at index and save to variable
-        bucket = self._buckets.get_at_index(hash_index)
+    def _pop(self, key: str, hash_result: int, default: object = None) -> object:
+        """
+        Same as pop, for a key whose hash has already been computed
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_batch)
+
+        # key found, leave a tombstone so later probe sequences stay intact
+        index, _, distance = self._probe(key, hash_result)
+        if index >= 0:
+            entry = self._buckets.get_at_index(index)
+            entry.is_tombstone = True
+            self._size -= 1
+            self._version += 1
+            self._uncount_probe(distance)
+            self._tombstone_added()
+            return entry.value
+
+        # key may still be waiting in the old table during a resize
+        if self._old_buckets is not None:
+            entry = self._take_old_entry(key, hash_result)
+            if entry is not None:
+                return entry.value
+
+        return default
+
+    def update_with(self, key: str, function: callable,
+                    default: object = None) -> object:
+        """
+        Replaces the value of given key by function(value), or adds the key
+        with value function(default) when it is not in the hash map
+        Returns the new value
+        """
+        return self._update(key, function, default, self._hash_function(key))
 
-        # initial removal when not empty and key matches on first try
-        if bucket is not None and bucket.key == key:
-            if bucket.is_tombstone is False:
-                bucket.is_tombstone = True
-                self._size -= 1
-                return
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value of given key, counting from 0 when the key
+        is not in the hash map
+        Returns the new value
+        """
+        return self._update(key, lambda value: value + delta, 0,
+                            self._hash_function(key))
 
-        # use quadratic probing to search for key
-        for ind in range(self._buckets.length()):
-            quad = hash_index + ind ** 2
-            index = quad % self._capacity
-            bucket = self._buckets.get_at_index(index)
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of given key, adding it with value default first
+        when it is not in the hash map
+        """
+        return self._update(key, _unchanged, default, self._hash_function(key))
 
-            # key found
-            if bucket is not None and bucket.key == key:
-                if bucket.is_tombstone is False:
-                    bucket.is_tombstone = True
-                    self._size -= 1
-                    return
+    def _update(self, key: str, function: callable, default: object,
+                hash_result: int) -> object:
+        """
+        Same as update_with, for a key whose hash has already been computed
+        The key is probed for once, whether it is found or added
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_batch)
+
+        # if table load greater than 0.5, need to resize table
+        self._check_load()
+
+        # an entry still waiting in the old table is replaced by a new one,
+        # and its value stands in for default
+        if self._old_buckets is not None:
+            entry = self._take_old_entry(key, hash_result)
+            if entry is not None:
+                default = entry.value
+
+        index, free, distance = self._probe(key, hash_result)
+
+        # when key matches, update the value in place
+        if index >= 0:
+            entry = self._buckets.get_at_index(index)
+            entry.value = function(entry.value)
+            return entry.value
+
+        # otherwise fill the first empty slot or tombstone in the sequence
+        value = function(default)
+        self._insert(free, key, value, hash_result, distance)
+        return value
+
+    def put_many(self, keys: list, values: list) -> None:
+        """
+        Puts every key with the value at the same position in values
+        The table is sized once for the whole batch and all keys are hashed
+        together, so no resize happens part way through
+        """
+        # room for every key while staying under the maximum load factor
+        needed = self._size + len(keys)
+        if needed / self._capacity >= self._max_load:
+            self.resize_table(int(needed / self._max_load) + 1)
+        self._finish_migration()
+
+        for key, value, hash_result in zip(keys, values,
+                                           hash_batch(self._hash_function, keys)):
+            self._put(key, value, hash_result)
+
+    def get_many(self, keys: list) -> DynamicArray:
+        """
+        Returns DynamicArray with the value of every key, None where absent
+        """
+        self._finish_migration()
+        return DynamicArray([self._get(key, hash_result) for key, hash_result
+                             in zip(keys, hash_batch(self._hash_function, keys))])
+
+    def contains_many(self, keys: list) -> DynamicArray:
+        """
+        Returns DynamicArray with True for every key in the hash map, False otherwise
+        """
+        self._finish_migration()
+        return DynamicArray([self._contains_key(key, hash_result) for key, hash_result
+                             in zip(keys, hash_batch(self._hash_function, keys))])
+
+    def remove_many(self, keys: list) -> None:
+        """
+        Removes every key in keys, skipping those not in the hash map
+        """
+        self._finish_migration()
+        for key, hash_result in zip(keys, hash_batch(self._hash_function, keys)):
+            self._remove(key, hash_result)
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -282,16 +651,22 @@ class HashMap:
         # initialize new DynamicArray object
         hash_tuples = DynamicArray()
 
+        # slots past the migration cursor of a resize are still in the old table
+        tables = [(self._buckets, 0)]
+        if self._old_buckets is not None:
+            tables.append((self._old_buckets, self._migrated))
+
         # iterate through HashMap
-        for ind in range(self._buckets.length()):
-            # get key/value at index and save to variable
-            bucket = self._buckets.get_at_index(ind)
-            if bucket is not None:
-                if bucket.is_tombstone is False:
-                    # when not empty and not a tombstone, save key/value pair to variable
-                    pair = bucket.key, bucket.value
-                    # append variable to DynamicArray object created
-                    hash_tuples.append(pair)
+        for buckets, start in tables:
+            for ind in range(start, buckets.length()):
+                # get key/value at index and save to variable
+                bucket = buckets.get_at_index(ind)
+                if bucket is not None:
+                    if bucket.is_tombstone is False:
+                        # when not empty and not a tombstone, save key/value pair to variable
+                        pair = bucket.key, bucket.value
+                        # append variable to DynamicArray object created
+                        hash_tuples.append(pair)
 
         # return DynamicArray with key/values as tuples
         return hash_tuples
@@ -300,36 +675,1295 @@ class HashMap:
         """
         Clears hash map contents
         """
-        # save capacity to a variable to keep capacity the same
-        cap = self._capacity
+        # fresh empty table of the same capacity
+        self._buckets = DynamicArray([None] * self._capacity)
+        self._old_buckets = None
+        self._tombstone_count = 0
+        self._probe_lengths = []
+        self._size = 0
+        self._version += 1
+
+    def _snapshot_options(self) -> dict:
+        """
+        Returns the constructor arguments besides capacity and function
+        that dump() records for load()
+        """
+        return {'migrate_step': self._migrate_step,
+                'tombstone_limit': self._tombstone_limit,
+                'power_of_two': self._power_of_two}
 
-        # creates empty HashMap object with current capacity
-        new_hash = HashMap(cap, self._hash_function)
+    def dump(self, file) -> None:
+        """
+        Writes the hash map to an open binary file: its capacity, options,
+        hash function and the slot index, cached hash, key and value of
+        every occupied slot, tombstones included, so load() can put every
+        entry back in its slot without hashing or probing
+        """
+        self._finish_migration()
+        indices, hashes, keys, values = array('Q'), [], [], []
+        tombstones = array('Q')
+        for ind in range(self._capacity):
+            entry = self._buckets.get_at_index(ind)
+            if entry is None:
+                continue
+            if entry.is_tombstone:
+                tombstones.append(len(keys))
+            indices.append(ind)
+            hashes.append(entry.hash)
+            keys.append(entry.key)
+            values.append(None if entry.is_tombstone else entry.value)
+
+        header = {'capacity': self._capacity,
+                  'options': self._snapshot_options(),
+                  'size': self._size,
+                  'tombstone_count': self._tombstone_count,
+                  'probe_lengths': self._probe_lengths}
+        write_snapshot(file, self._SNAPSHOT_KIND, self._hash_function, header,
+                       indices, pack_hashes(hashes), keys, values, tombstones)
+
+    @classmethod
+    def load(cls, file, function=None) -> 'HashMap':
+        """
+        Returns the hash map dump() wrote to an open binary file
+        Entries go straight back into their slots with their cached hashes;
+        only when the hash function differs in this process, like the salted
+        'builtin' and 'siphash', are the keys hashed and put again
+        Only load trusted files, keys and values are unpickled
+
+        :param function: hash function replacing the one the map was dumped
+                         with, required if that one is not registered by name
+        """
+        header, columns, function, hashes_valid = read_snapshot(
+            file, cls._SNAPSHOT_KIND, function)
+        indices, hashes, keys, values, tombstones = columns
+        map = cls(header['capacity'], function, **header['options'])
+        if not hashes_valid:
+            dead = set(tombstones)
+            live = [ind for ind in range(len(keys)) if ind not in dead]
+            map.put_many([keys[ind] for ind in live],
+                         [values[ind] for ind in live])
+            return map
+
+        buckets = [None] * map._capacity
+        with paused_gc():
+            for ind, hash_result, key, value in zip(indices, hashes, keys,
+                                                    values):
+                buckets[ind] = HashEntry(key, value, hash_result)
+        for position in tombstones:
+            buckets[indices[position]].is_tombstone = True
+
+        map._buckets = DynamicArray(buckets)
+        map._size = header['size']
+        map._tombstone_count = header['tombstone_count']
+        map._probe_lengths = header['probe_lengths']
+        return map
 
-        # updates references
-        self._buckets = new_hash._buckets
+    def __iter__(self):
+        """
+        Yields the HashEntry of every live slot, skipping tombstones
+        Every call starts its own pass over the table without copying it
+        Raises RuntimeError if keys are added or removed during the pass
+        """
+        self._finish_migration()
+        version = self._version
+        buckets = self._buckets
+
+        for ind in range(buckets.length()):
+            bucket = buckets.get_at_index(ind)
+            if bucket is not None and not bucket.is_tombstone:
+                yield bucket
+                if self._version != version:
+                    raise RuntimeError('hash map changed size during iteration')
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key in the hash map, see __iter__
+        """
+        for entry in self:
+            yield entry.key, entry.value
+
+    def keys(self):
+        """
+        Yields every key in the hash map, see __iter__
+        """
+        for entry in self:
+            yield entry.key
+
+    def values(self):
+        """
+        Yields every value in the hash map, see __iter__
+        """
+        for entry in self:
+            yield entry.value
+
+
+class CompactHashMap(HashMap):
+    _SNAPSHOT_KIND = 'compact open addressing'
+
+    def __init__(self, capacity: int, function, migrate_step: int = 0,
+                 tombstone_limit: float = 0.25,
+                 power_of_two: bool = False) -> None:
+        """
+        Initialize new HashMap that uses quadratic probing for collision
+        resolution and stores its slots as struct-of-arrays:
+        parallel key, value and cached hash arrays plus a tombstone bitmap.
+        A slot is empty when its key is None and a tombstone when its bit is
+        set, so None cannot be a key
+
+        Takes the same arguments as HashMap, but always resizes in one go,
+        so migrate_step must be 0
+        """
+        if migrate_step:
+            raise ValueError('CompactHashMap does not resize incrementally, '
+                             'migrate_step must be 0')
+
+        # capacity must be a prime number, or a power of two if requested
+        self._power_of_two = power_of_two
+        self._capacity = self._next_capacity(capacity)
+        self._allocate(self._capacity)
+
+        self._hash_function = get_hash_function(function)
         self._size = 0
+        self._max_load = 0.5
+        self._tombstone_count = 0
+        self._tombstone_limit = tombstone_limit
+        self._version = 0
+
+        # always resizes in one go
+        self._old_buckets = None
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._keys[i] is None:
+                entry = None
+            else:
+                entry = HashEntry(self._keys[i], self._values[i])
+                entry.is_tombstone = self._is_tombstone(i)
+            out += str(i) + ': ' + str(entry) + '\n'
+        return out
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replace slot arrays with empty ones of the given capacity
+        """
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._hashes = array('Q', bytes(8 * capacity))
+        self._tombstones = bytearray((capacity + 7) // 8)
+        self._probe_lengths = []
+
+    def _is_tombstone(self, index: int) -> bool:
+        """
+        Returns True if the tombstone bit of the slot at index is set
+        """
+        return bool(self._tombstones[index >> 3] & (1 << (index & 7)))
+
+    def _probe(self, key: str, hash_result: int) -> tuple[int, int, int]:
+        """
+        Probe for key starting at its home slot
+
+        :returns: A tuple of the index holding the key (-1 if absent),
+                  the first reusable slot seen (-1 if the table is full)
+                  and how many steps past home the key's slot is, or the
+                  reusable slot's when the key is absent
+        """
+        keys, hashes, tombstones = self._keys, self._hashes, self._tombstones
+        capacity = self._capacity
+        mask = capacity - 1 if self._power_of_two else 0
+        index = mix_hash(hash_result) & mask if mask else hash_result % capacity
+        free = free_step = -1
+
+        for step in range(1, capacity + 1):
+            slot_key = keys[index]
+
+            # a never used slot ends the probe sequence
+            if slot_key is None:
+                if free < 0:
+                    return -1, index, step - 1
+                return -1, free, free_step - 1
+
+            if tombstones[index >> 3] & (1 << (index & 7)):
+                if free < 0:
+                    free, free_step = index, step
+
+            # compare cached hashes before comparing keys
+            elif hashes[index] == hash_result and slot_key == key:
+                return index, free, step - 1
+
+            if mask:
+                index = (index + step) & mask
+            else:
+                index = (index + 2 * step - 1) % capacity
+
+        return -1, free, free_step - 1
+
+    def _place(self, key: str, value: object, hash_result: int) -> None:
+        """
+        Store a key known to be absent in the first empty slot of its probe
+        sequence; used while rebuilding, when the table has no tombstones
+        """
+        keys, capacity = self._keys, self._capacity
+        mask = capacity - 1 if self._power_of_two else 0
+        index = mix_hash(hash_result) & mask if mask else hash_result % capacity
+
+        for step in range(1, capacity + 1):
+            if keys[index] is None:
+                keys[index] = key
+                self._values[index] = value
+                self._hashes[index] = hash_result
+                self._count_probe(step - 1)
+                return
+
+            if mask:
+                index = (index + step) & mask
+            else:
+                index = (index + 2 * step - 1) % capacity
+
+    def _put(self, key: str, value: object, hash_result: int) -> None:
+        """
+        Same as put, for a key whose hash has already been computed
+        """
+        # if table load greater than 0.5, need to resize table
+        self._check_load()
+
+        hash_result &= _HASH_MASK
+        index, free, distance = self._probe(key, hash_result)
+
+        # when key matches, replace the value
+        if index >= 0:
+            self._values[index] = value
+            return
+
+        # otherwise fill the first empty slot or tombstone in the sequence
+        self._insert(free, key, value, hash_result, distance)
+
+    def _insert(self, free: int, key: str, value: object, hash_result: int,
+                distance: int) -> None:
+        """
+        Stores a key _probe found absent in the reusable slot free,
+        distance probe steps past its home slot
+        """
+        # an empty slot's key is None, so a None key would be lost
+        if key is None:
+            raise TypeError('CompactHashMap keys cannot be None')
+        if self._keys[free] is not None:
+            self._tombstone_count -= 1
+        self._keys[free] = key
+        self._values[free] = value
+        self._hashes[free] = hash_result
+        self._tombstones[free >> 3] &= ~(1 << (free & 7)) & 0xFF
+        self._size += 1
+        self._version += 1
+        self._count_probe(distance)
+
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Replaces the slot arrays with ones of exactly new_capacity and moves
+        all live entries over using their cached hashes; tombstones are dropped
+        """
+        keys, values, hashes = self._keys, self._values, self._hashes
+        tombstones = self._tombstones
+
+        self._capacity = new_capacity
+        self._allocate(new_capacity)
+        self._tombstone_count = 0
+        self._version += 1
+
+        for index in range(len(keys)):
+            if keys[index] is not None and \
+                    not tombstones[index >> 3] & (1 << (index & 7)):
+                self._place(keys[index], values[index], hashes[index])
+
+    def empty_buckets(self) -> int:
+        """
+        Returns number of empty buckets in the hash table
+        """
+        return self._capacity - self._size
+
+    def _get(self, key: str, hash_result: int) -> object:
+        """
+        Same as get, for a key whose hash has already been computed
+        """
+        index = self._probe(key, hash_result & _HASH_MASK)[0]
+        return None if index < 0 else self._values[index]
+
+    def _contains_key(self, key: str, hash_result: int) -> bool:
+        """
+        Same as contains_key, for a key whose hash has already been computed
+        """
+        return self._probe(key, hash_result & _HASH_MASK)[0] >= 0
+
+    def _pop(self, key: str, hash_result: int, default: object = None) -> object:
+        """
+        Same as pop, for a key whose hash has already been computed
+        """
+        index, _, distance = self._probe(key, hash_result & _HASH_MASK)
+        if index < 0:
+            return default
+
+        # keep the key so the probe sequence stays intact, drop the value
+        value = self._values[index]
+        self._tombstones[index >> 3] |= 1 << (index & 7)
+        self._values[index] = None
+        self._size -= 1
+        self._version += 1
+        self._uncount_probe(distance)
+        self._tombstone_added()
+        return value
+
+    def _update(self, key: str, function: callable, default: object,
+                hash_result: int) -> object:
+        """
+        Same as update_with, for a key whose hash has already been computed
+        """
+        # if table load greater than 0.5, need to resize table
+        self._check_load()
+
+        hash_result &= _HASH_MASK
+        index, free, distance = self._probe(key, hash_result)
+
+        # when key matches, update the value in place
+        if index >= 0:
+            value = self._values[index] = function(self._values[index])
+            return value
+
+        # otherwise fill the first empty slot or tombstone in the sequence
+        value = function(default)
+        self._insert(free, key, value, hash_result, distance)
+        return value
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns DynamicArray object with keys/values from hash map as a tuple
+        """
+        hash_tuples = DynamicArray()
+        for index in range(self._capacity):
+            if self._keys[index] is not None and not self._is_tombstone(index):
+                hash_tuples.append((self._keys[index], self._values[index]))
+        return hash_tuples
+
+    def clear(self) -> None:
+        """
+        Clears hash map contents
+        """
+        self._allocate(self._capacity)
+        self._tombstone_count = 0
+        self._size = 0
+        self._version += 1
+
+    def _snapshot_options(self) -> dict:
+        """
+        Returns the constructor arguments besides capacity and function
+        that dump() records for load()
+        """
+        return {'tombstone_limit': self._tombstone_limit,
+                'power_of_two': self._power_of_two}
+
+    def dump(self, file) -> None:
+        """
+        Writes the hash map to an open binary file: its capacity, options,
+        hash function and its slot arrays as they are, so load() only has
+        to read them back
+        """
+        header = {'capacity': self._capacity,
+                  'options': self._snapshot_options(),
+                  'size': self._size,
+                  'tombstone_count': self._tombstone_count,
+                  'probe_lengths': self._probe_lengths}
+        write_snapshot(file, self._SNAPSHOT_KIND, self._hash_function, header,
+                       list(self._keys), list(self._values),
+                       array('Q', self._hashes), bytearray(self._tombstones))
+
+    @classmethod
+    def load(cls, file, function=None) -> 'CompactHashMap':
+        """
+        Returns the hash map dump() wrote to an open binary file, see
+        HashMap.load
+        """
+        header, columns, function, hashes_valid = read_snapshot(
+            file, cls._SNAPSHOT_KIND, function)
+        keys, values, hashes, tombstones = columns
+        map = cls(header['capacity'], function, **header['options'])
+        if not hashes_valid:
+            live = [index for index in range(len(keys))
+                    if keys[index] is not None
+                    and not tombstones[index >> 3] & (1 << (index & 7))]
+            map.put_many([keys[index] for index in live],
+                         [values[index] for index in live])
+            return map
+
+        map._keys, map._values = keys, values
+        map._hashes, map._tombstones = hashes, tombstones
+        map._size = header['size']
+        map._tombstone_count = header['tombstone_count']
+        map._probe_lengths = header['probe_lengths']
+        return map
+
+    def _live_slots(self):
+        """
+        Yields the index of every live slot, skipping tombstones
+        Raises RuntimeError if keys are added or removed during the pass
+        """
+        version = self._version
+        keys, tombstones = self._keys, self._tombstones
+
+        for index in range(len(keys)):
+            if keys[index] is not None and \
+                    not tombstones[index >> 3] & (1 << (index & 7)):
+                yield index
+                if self._version != version:
+                    raise RuntimeError('hash map changed size during iteration')
 
     def __iter__(self):
         """
-        Enables hash map to iterate across iterself
+        Yields a HashEntry for every live slot in the hash map
+        """
+        for index in self._live_slots():
+            yield HashEntry(self._keys[index], self._values[index])
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key in the hash map
+        """
+        keys, values = self._keys, self._values
+        for index in self._live_slots():
+            yield keys[index], values[index]
+
+    def keys(self):
+        """
+        Yields every key in the hash map
+        """
+        keys = self._keys
+        for index in self._live_slots():
+            yield keys[index]
+
+    def values(self):
+        """
+        Yields every value in the hash map
+        """
+        values = self._values
+        for index in self._live_slots():
+            yield values[index]
+
+
+class RobinHoodHashMap(HashMap):
+    _SNAPSHOT_KIND = 'robin hood'
+
+    def __init__(self, capacity: int, function, max_load: float = 0.9) -> None:
+        """
+        Initialize new HashMap that uses Robin Hood linear probing for
+        collision resolution. An entry further from its home slot takes the
+        place of one closer to home, which keeps probe sequences short and
+        even, so the table can run up to max_load instead of 0.5.
+        Removal shifts the following entries back instead of leaving tombstones
+        """
+        # a full table would leave probes and inserts without an empty slot
+        if not 0 < max_load < 1:
+            raise ValueError(f"max_load must be between 0 and 1, not {max_load!r}")
+        super().__init__(capacity, function)
+        self._max_load = max_load
+
+    def _snapshot_options(self) -> dict:
+        """
+        Returns the constructor arguments besides capacity and function
+        that dump() records for load()
+        """
+        return {'max_load': self._max_load}
+
+    def _distance(self, entry: HashEntry, index: int) -> int:
+        """
+        Returns how many slots entry sits past its home slot
+        """
+        return (index - entry.hash % self._capacity) % self._capacity
+
+    def _probe(self, key: str, hash_result: int) -> int:
+        """
+        Linear probe for key starting at its home slot
+        Stops at an empty slot or at an entry closer to its home than the
+        key would be, since the key would have displaced that entry
+
+        :returns: index holding the key, or -1 if it is absent
+        """
+        capacity = self._capacity
+        index = hash_result % capacity
+
+        for distance in range(capacity):
+            entry = self._buckets.get_at_index(index)
+            if entry is None or self._distance(entry, index) < distance:
+                return -1
+            if entry.hash == hash_result and entry.key == key:
+                return index
+            index = (index + 1) % capacity
+
+        return -1
+
+    def _place(self, entry: HashEntry) -> None:
+        """
+        Inserts an entry whose key is known to be absent, displacing any
+        entry that is closer to its home slot than the one being carried
+        """
+        capacity = self._capacity
+        index = entry.hash % capacity
+        distance = 0
+
+        while True:
+            current = self._buckets.get_at_index(index)
+            if current is None:
+                self._buckets.set_at_index(index, entry)
+                self._count_probe(distance)
+                return
+
+            # richer entry gives its slot up and continues probing instead
+            current_distance = self._distance(current, index)
+            if current_distance < distance:
+                self._buckets.set_at_index(index, entry)
+                self._count_probe(distance)
+                self._uncount_probe(current_distance)
+                entry, distance = current, current_distance
+
+            index = (index + 1) % capacity
+            distance += 1
+
+    def _put(self, key: str, value: object, hash_result: int) -> None:
+        """
+        Same as put, for a key whose hash has already been computed
+        """
+        # resize once the table reaches its maximum load factor
+        if self.table_load() >= self._max_load:
+            self.resize_table(self._capacity * 2)
+
+        index = self._probe(key, hash_result)
+
+        # when key matches, replace the value
+        if index >= 0:
+            self._buckets.get_at_index(index).value = value
+            return
+
+        self._place_new(key, value, hash_result)
+
+    def _place_new(self, key: str, value: object, hash_result: int) -> None:
+        """
+        Places a key _probe found absent and counts it
+        """
+        self._place(HashEntry(key, value, hash_result))
+        self._size += 1
+        self._version += 1
+
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Moves every entry into a new table of exactly new_capacity
+        """
+        buckets = self._buckets
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._capacity = new_capacity
+        self._probe_lengths = []
+        self._version += 1
+
+        for ind in range(buckets.length()):
+            entry = buckets.get_at_index(ind)
+            if entry is not None:
+                self._place(entry)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns number of empty buckets in the hash table
+        """
+        return self._capacity - self._size
+
+    def _get(self, key: str, hash_result: int) -> object:
+        """
+        Same as get, for a key whose hash has already been computed
+        """
+        index = self._probe(key, hash_result)
+        return None if index < 0 else self._buckets.get_at_index(index).value
+
+    def _contains_key(self, key: str, hash_result: int) -> bool:
+        """
+        Same as contains_key, for a key whose hash has already been computed
+        """
+        return self._probe(key, hash_result) >= 0
+
+    def _update(self, key: str, function: callable, default: object,
+                hash_result: int) -> object:
+        """
+        Same as update_with, for a key whose hash has already been computed
+        """
+        # resize once the table reaches its maximum load factor
+        if self.table_load() >= self._max_load:
+            self.resize_table(self._capacity * 2)
+
+        index = self._probe(key, hash_result)
+
+        # when key matches, update the value in place
+        if index >= 0:
+            entry = self._buckets.get_at_index(index)
+            entry.value = function(entry.value)
+            return entry.value
+
+        value = function(default)
+        self._place_new(key, value, hash_result)
+        return value
+
+    def _pop(self, key: str, hash_result: int, default: object = None) -> object:
+        """
+        Same as pop, for a key whose hash has already been computed
+        Following entries that are not in their home slot shift back one
+        slot to close the gap, so no tombstone is left behind
+        """
+        index = self._probe(key, hash_result)
+        if index < 0:
+            return default
+
+        value = self._buckets.get_at_index(index).value
+        self._uncount_probe(self._distance(self._buckets.get_at_index(index), index))
+
+        capacity = self._capacity
+        while True:
+            following = (index + 1) % capacity
+            entry = self._buckets.get_at_index(following)
+            if entry is None:
+                self._buckets.set_at_index(index, None)
+                break
+
+            distance = self._distance(entry, following)
+            if distance == 0:
+                self._buckets.set_at_index(index, None)
+                break
+
+            # shifted entry moves one step closer to its home slot
+            self._buckets.set_at_index(index, entry)
+            self._uncount_probe(distance)
+            self._count_probe(distance - 1)
+            index = following
+
+        self._size -= 1
+        self._version += 1
+        return value
+
+
+# buffer hash map header: magic, then capacity, size, tombstone count,
+# power_of_two, key and value slot widths, overflow area size and bytes used,
+# each an unsigned 64-bit integer, the tombstone limit as a double, then the
+# registered hash function name
+_FUNCTION_NAME_SIZE = 32
+_BUFFER_HEADER = struct.Struct(f'<8s8Qd{_FUNCTION_NAME_SIZE}s')
+_BUFFER_MAGIC = b'HASHMAP2'
+_SIZE_AT, _TOMBSTONES_AT, _OVERFLOW_USED_AT = 16, 24, 64
+_HEADER_FIELD = struct.Struct('<Q')
+
+# every slot starts with the byte length of its encoding, all ones when empty
+_SLOT_LENGTH = struct.Struct('<I')
+_EMPTY_SLOT = 0xFFFFFFFF
+_OVERFLOW_OFFSET = struct.Struct('<Q')
+
+# hash functions salted with a per-process secret cannot be shared or stored
+_PROCESS_SEEDED = ('siphash', 'builtin')
+
+
+class _SharedColumn:
+    """
+    List-like column of fixed-width slots in a buffer hash map,
+    None standing for an empty slot. An encoding longer than the slot
+    goes to the map's overflow area and the slot keeps its offset instead
+    """
+
+    def __init__(self, owner: '_BufferHashMap', offset: int, capacity: int,
+                 width: int, encode: callable, decode: callable) -> None:
+        self._owner = owner
+        self._buffer = owner._buffer
+        self._offset = offset
+        self._capacity = capacity
+        self._width = width
+        self._stride = _SLOT_LENGTH.size + width
+        self._encode = encode
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return self._capacity
+
+    def __iter__(self):
+        for index in range(self._capacity):
+            yield self[index]
+
+    def __getitem__(self, index: int) -> object:
+        buffer = self._buffer
+        at = self._offset + index * self._stride
+        length = _SLOT_LENGTH.unpack_from(buffer, at)[0]
+        if length == _EMPTY_SLOT:
+            return None
+
+        at += _SLOT_LENGTH.size
+        if length > self._width:
+            at = self._owner._overflow_at + \
+                _OVERFLOW_OFFSET.unpack_from(buffer, at)[0]
+        return self._decode(buffer[at:at + length])
+
+    def __setitem__(self, index: int, value: object) -> None:
+        at = self._offset + index * self._stride
+        if value is None:
+            _SLOT_LENGTH.pack_into(self._buffer, at, _EMPTY_SLOT)
+            return
+
+        data = self._encode(value)
+        if len(data) > self._width:
+            _OVERFLOW_OFFSET.pack_into(self._buffer, at + _SLOT_LENGTH.size,
+                                       self._owner._store_overflow(data))
+        else:
+            start = at + _SLOT_LENGTH.size
+            self._buffer[start:start + len(data)] = data
+        _SLOT_LENGTH.pack_into(self._buffer, at, len(data))
+
+    def clear(self) -> None:
+        """
+        Marks every slot empty
+        """
+        empty = _SLOT_LENGTH.pack(_EMPTY_SLOT) + bytes(self._width)
+        self._buffer[self._offset:self._offset + self._capacity * self._stride] = \
+            empty * self._capacity
+
+    def overflow_length(self, index: int) -> int:
+        """
+        Returns the overflow bytes the slot at index takes, read from its
+        length without decoding it
+        """
+        length = _SLOT_LENGTH.unpack_from(self._buffer,
+                                          self._offset + index * self._stride)[0]
+        return length if self._width < length != _EMPTY_SLOT else 0
+
+    def encoded_length(self, value: object) -> int:
+        """
+        Returns the overflow bytes storing value would take
+        """
+        length = len(self._encode(value))
+        return length if length > self._width else 0
+
+
+def _encode_key(key: str) -> bytes:
+    return key.encode('utf-8', 'surrogatepass')
+
+
+def _decode_key(data: memoryview) -> str:
+    return str(data, 'utf-8', 'surrogatepass')
+
+
+class _BufferHashMap(CompactHashMap):
+    """
+    CompactHashMap laid out over one flat writable buffer: a header, then
+    cached hashes, fixed-width key and value slots, the tombstone bitmap
+    and an overflow area. Probing, tombstones and iteration are
+    CompactHashMap's; subclasses provide the buffer and may make room
+    when it runs out, which otherwise raises MemoryError
+
+    Keys are strings stored as UTF-8 and values are pickled. Each slot
+    holds key_width / value_width bytes inline; longer encodings are
+    appended to the overflow area
+
+    Size, tombstone count and overflow use live in the header, so every
+    process using the buffer sees them. A process opening an existing
+    buffer only rebuilds the probe length histogram when its first write
+    or stats() call needs it, so lookups can start right away
+    """
+
+    @staticmethod
+    def _check_function(function: str) -> None:
+        """
+        Rejects hash functions that are not registered under a name or
+        give different results in different processes
+        """
+        if function in _PROCESS_SEEDED or not isinstance(function, str):
+            raise ValueError(f"{function!r} does not hash keys the same way in "
+                             f"every process, use a registered name such as 'fnv1a'")
+        if len(function.encode()) > _FUNCTION_NAME_SIZE:
+            raise ValueError(f"hash function name {function!r} is longer than "
+                             f"{_FUNCTION_NAME_SIZE} bytes")
+        get_hash_function(function)
+
+    @staticmethod
+    def _layout_size(capacity: int, key_width: int, value_width: int,
+                     overflow_size: int) -> int:
+        """
+        Returns the bytes a buffer of the given layout takes
+        """
+        return (_BUFFER_HEADER.size
+                + capacity * (8 + 2 * _SLOT_LENGTH.size + key_width + value_width)
+                + (capacity + 7) // 8 + overflow_size)
+
+    @staticmethod
+    def _write_header(buffer, capacity: int, function: str,
+                      key_width: int, value_width: int, overflow_size: int,
+                      tombstone_limit: float, power_of_two: bool) -> None:
+        """
+        Writes the header of an empty map into buffer
+        """
+        _BUFFER_HEADER.pack_into(buffer, 0, _BUFFER_MAGIC, capacity, 0, 0,
+                                 power_of_two, key_width, value_width,
+                                 overflow_size, 0, tombstone_limit,
+                                 function.encode())
+
+    def _open(self, buffer: memoryview) -> None:
+        """
+        Lays the slot arrays out over buffer as its header describes
+        """
+        (magic, capacity, _, _, power_of_two, key_width, value_width,
+         overflow_size, _, tombstone_limit,
+         function) = _BUFFER_HEADER.unpack_from(buffer)
+        if magic != _BUFFER_MAGIC:
+            raise ValueError('buffer does not hold a hash map')
+
+        self._buffer = buffer
+        self._capacity = capacity
+        self._tombstone_limit = tombstone_limit
+        self._power_of_two = bool(power_of_two)
+        self._function_name = function.rstrip(b'\0').decode()
+        self._hash_function = get_hash_function(self._function_name)
+        self._key_width = key_width
+        self._value_width = value_width
+        self._max_load = 0.5
+        self._probe_lengths = None
+        self._old_buckets = None
+
+        at = _BUFFER_HEADER.size
+        self._hashes = buffer[at:at + 8 * capacity].cast('Q')
+        at += 8 * capacity
+        self._keys = _SharedColumn(self, at, capacity, key_width,
+                                   _encode_key, _decode_key)
+        at += capacity * (_SLOT_LENGTH.size + key_width)
+        self._values = _SharedColumn(self, at, capacity, value_width,
+                                     pickle.dumps, pickle.loads)
+        at += capacity * (_SLOT_LENGTH.size + value_width)
+        self._tombstones = buffer[at:at + (capacity + 7) // 8]
+        self._overflow_at = at + (capacity + 7) // 8
+        self._overflow_size = overflow_size
+
+    def _release(self) -> None:
+        """
+        Drops every view into the buffer so it can be closed
+        """
+        self._hashes.release()
+        self._tombstones.release()
+        self._keys = self._values = self._buffer = None
+
+    def _load_probe_lengths(self) -> None:
+        """
+        Rebuilds the probe length histogram of a buffer this process
+        opened, before the first write or stats() call that needs it
+        """
+        if self._probe_lengths is None:
+            self._probe_lengths = []
+            for index in self._live_slots():
+                self._count_probe(
+                    self._probe(self._keys[index], self._hashes[index])[2])
+
+    # size, tombstone count and overflow use are kept in the header
+    @property
+    def _size(self) -> int:
+        return _HEADER_FIELD.unpack_from(self._buffer, _SIZE_AT)[0]
+
+    @_size.setter
+    def _size(self, size: int) -> None:
+        _HEADER_FIELD.pack_into(self._buffer, _SIZE_AT, size)
+
+    @property
+    def _tombstone_count(self) -> int:
+        return _HEADER_FIELD.unpack_from(self._buffer, _TOMBSTONES_AT)[0]
+
+    @_tombstone_count.setter
+    def _tombstone_count(self, count: int) -> None:
+        _HEADER_FIELD.pack_into(self._buffer, _TOMBSTONES_AT, count)
+
+    @property
+    def _overflow_used(self) -> int:
+        return _HEADER_FIELD.unpack_from(self._buffer, _OVERFLOW_USED_AT)[0]
+
+    @_overflow_used.setter
+    def _overflow_used(self, used: int) -> None:
+        _HEADER_FIELD.pack_into(self._buffer, _OVERFLOW_USED_AT, used)
+
+    def _store_overflow(self, data: bytes) -> int:
+        """
+        Appends data to the overflow area and returns its offset there
+        """
+        used = self._overflow_used
+        start = self._overflow_at + used
+        self._buffer[start:start + len(data)] = data
+        self._overflow_used = used + len(data)
+        return used
+
+    def _room_needed(self, key: str, value: object) -> int:
+        """
+        Returns how many bytes the overflow area lacks for storing value
+        and, unless it is None because it is already stored, key;
+        0 when they fit
+        """
+        needed = self._values.encoded_length(value)
+        if key is not None:
+            needed += self._keys.encoded_length(key)
+        return max(self._overflow_used + needed - self._overflow_size, 0)
+
+    def _live_overflow(self) -> int:
+        """
+        Returns the overflow bytes taken by live entries, leaving out what
+        replaced and removed entries left behind
+        """
+        keys, values = self._keys, self._values
+        return sum(keys.overflow_length(index) + values.overflow_length(index)
+                   for index in self._live_slots())
+
+    def _make_room(self, needed: int) -> None:
+        """
+        Frees at least needed bytes of overflow area or raises MemoryError
+        A buffer that cannot grow, like a shared block, rebuilds the table in
+        place to drop the bytes of replaced and removed entries, and raises
+        when the live entries leave no room even then
+        """
+        if self._overflow_used - self._live_overflow() < needed:
+            raise MemoryError('hash map overflow area is full')
+        self._rehash(self._capacity)
+
+    def dump(self, file) -> None:
+        """
+        Writes the map as a CompactHashMap snapshot, see CompactHashMap.dump
+        """
+        self._load_probe_lengths()
+        super().dump(file)
+
+    @classmethod
+    def load(cls, file, function=None) -> None:
+        """
+        dump() of a buffer hash map writes a CompactHashMap snapshot,
+        read it with CompactHashMap.load
+        """
+        raise TypeError(f"{cls.__name__} snapshots load as CompactHashMap")
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Empties every slot and the overflow area in place
+        """
+        self._keys.clear()
+        self._values.clear()
+        self._hashes[:] = array('Q', bytes(8 * capacity))
+        self._tombstones[:] = bytes(len(self._tombstones))
+        self._overflow_used = 0
+        self._probe_lengths = []
+
+    def _put(self, key: str, value: object, hash_result: int) -> None:
+        """
+        Same as put, for a key whose hash has already been computed
+        Makes room in the overflow area before writing anything, so no slot
+        is left half written; the key only needs room when it is new
+        """
+        self._load_probe_lengths()
+        self._check_load()
+
+        hash_result &= _HASH_MASK
+        index, free, distance = self._probe(key, hash_result)
+
+        # making room may move every slot, so the key is probed for again
+        needed = self._room_needed(None if index >= 0 else key, value)
+        if needed:
+            self._make_room(needed)
+            self._put(key, value, hash_result)
+        elif index >= 0:
+            self._values[index] = value
+        else:
+            self._insert(free, key, value, hash_result, distance)
+
+    def _update(self, key: str, function: callable, default: object,
+                hash_result: int) -> object:
+        """
+        Same as update_with, for a key whose hash has already been computed
+        A new value without room is put again once room has been made
+        """
+        self._load_probe_lengths()
+        self._check_load()
+
+        hash_result &= _HASH_MASK
+        index, free, distance = self._probe(key, hash_result)
+        value = function(self._values[index] if index >= 0 else default)
+
+        if self._room_needed(None if index >= 0 else key, value):
+            self._put(key, value, hash_result)
+        elif index >= 0:
+            self._values[index] = value
+        else:
+            self._insert(free, key, value, hash_result, distance)
+        return value
+
+    def _pop(self, key: str, hash_result: int, default: object = None) -> object:
+        """
+        Same as pop, for a key whose hash has already been computed
         """
-        self._index = 0
+        self._load_probe_lengths()
+        return super()._pop(key, hash_result, default)
+
+    def stats(self) -> dict:
+        """
+        Returns occupancy statistics of the table, see HashMap.stats
+        """
+        self._load_probe_lengths()
+        return super().stats()
+
+
+class SharedHashMap(_BufferHashMap):
+    def __init__(self, capacity: int, function: str = 'fnv1a',
+                 key_width: int = 24, value_width: int = 24,
+                 overflow_size: int = 1 << 20,
+                 tombstone_limit: float = 0.25,
+                 power_of_two: bool = False, name: str = None) -> None:
+        """
+        Initialize new CompactHashMap whose slot arrays live in a new
+        multiprocessing.shared_memory block, so one process can build the
+        map and any number of processes attach() to it and read it without
+        copying it
+
+        The table cannot grow: capacity is fixed when the block is created
+        and keys plus tombstones stay under capacity / 2. Space in the overflow
+        area left behind by replaced or removed entries is reclaimed when
+        the table drops its tombstones or the overflow area runs out.
+        MemoryError is raised when the table or the live entries' overflow
+        bytes are full
+
+        function must be the registered name of a hash function that gives
+        the same result in every process, so not 'siphash' or 'builtin'
+
+        Only one process may change the map, and readers must not read
+        while it is being changed
+        """
+        self._check_function(function)
+
+        # room for the overflow offset a slot keeps instead of its bytes
+        key_width = max(key_width, _OVERFLOW_OFFSET.size)
+        value_width = max(value_width, _OVERFLOW_OFFSET.size)
+        self._power_of_two = power_of_two
+        capacity = self._next_capacity(capacity)
+
+        shm = shared_memory.SharedMemory(name, create=True, size=self._layout_size(
+            capacity, key_width, value_width, overflow_size))
+        self._write_header(shm.buf, capacity, function, key_width, value_width,
+                           overflow_size, tombstone_limit, power_of_two)
+        self._shm = shm
+        self._version = 0
+        self._open(shm.buf)
+        self._allocate(capacity)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedHashMap':
+        """
+        Returns the SharedHashMap another process created under name,
+        reading and writing the same memory
+        """
+        try:
+            shm = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            # before Python 3.13 attaching registers the block with this
+            # process's resource tracker, which would unlink it as soon as
+            # this process exits; only the creator's unlink() may free it
+            shm = shared_memory.SharedMemory(name)
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        if bytes(shm.buf[:len(_BUFFER_MAGIC)]) != _BUFFER_MAGIC:
+            shm.close()
+            raise ValueError(f"{name} is not a shared hash map")
+
+        shared = cls.__new__(cls)
+        shared._shm = shm
+        shared._version = 0
+        shared._open(shm.buf)
+        return shared
+
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Rebuilds the table in place, dropping tombstones and unused
+        overflow bytes; the block cannot grow
+        """
+        if new_capacity != self._capacity:
+            raise MemoryError(f"shared hash map is fixed at "
+                              f"{self._capacity} slots")
+
+        entries = [(self._keys[index], self._values[index], self._hashes[index])
+                   for index in self._live_slots()]
+        self._allocate(self._capacity)
+        self._tombstone_count = 0
+        self._version += 1
+
+        for key, value, hash_result in entries:
+            self._place(key, value, hash_result)
+
+    def get_name(self) -> str:
+        """
+        Returns the name other processes attach to the map by
+        """
+        return self._shm.name
+
+    def close(self) -> None:
+        """
+        Detaches this process from the map, which stays available to others
+        """
+        self._release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory once every process has closed the map;
+        called by the process that created it
+        """
+        # a process attached from a fork shares this process's resource
+        # tracker and took the block off it, so it is put back first
+        resource_tracker.register(self._shm._name, 'shared_memory')
+        self._shm.unlink()
+
+    def __enter__(self) -> 'SharedHashMap':
         return self
 
-    def __next__(self):
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class MappedHashMap(_BufferHashMap):
+    def __init__(self, path: str, capacity: int = 11, function: str = 'fnv1a',
+                 key_width: int = 24, value_width: int = 24,
+                 overflow_size: int = 1 << 16,
+                 tombstone_limit: float = 0.25,
+                 power_of_two: bool = False) -> None:
+        """
+        Initialize new CompactHashMap whose slot arrays live in the file
+        at path, mapped into memory. An existing file is opened as it is
+        and the layout arguments are ignored; otherwise a new map is
+        created there. Opening reads nothing but the header, pages of the
+        table are read from disk as lookups touch them
+
+        Growing the table or its overflow area rebuilds the map into a new
+        file that replaces the old one; rebuilds at the same capacity also
+        drop tombstones and unused overflow bytes
+
+        Changes reach the file as the system writes mapped pages back,
+        and at the latest on flush() or close()
+
+        function must be the registered name of a hash function that gives
+        the same result in every process, so not 'siphash' or 'builtin'
+        """
+        self._path = path
+        self._version = 0
+        if not os.path.exists(path):
+            self._check_function(function)
+            self._power_of_two = power_of_two
+            self._create(path, self._next_capacity(capacity), function,
+                         max(key_width, _OVERFLOW_OFFSET.size),
+                         max(value_width, _OVERFLOW_OFFSET.size),
+                         overflow_size, tombstone_limit, power_of_two)
+        self._map(path)
+
+    @staticmethod
+    def _create(path: str, capacity: int, function: str, key_width: int,
+                value_width: int, overflow_size: int, tombstone_limit: float,
+                power_of_two: bool) -> None:
+        """
+        Writes a file holding an empty map of the given layout
+        """
+        size = _BufferHashMap._layout_size(capacity, key_width, value_width,
+                                           overflow_size)
+        with open(path, 'w+b') as file:
+            file.truncate(size)
+            with mmap.mmap(file.fileno(), size) as mapped:
+                _BufferHashMap._write_header(mapped, capacity, function,
+                                             key_width, value_width,
+                                             overflow_size, tombstone_limit,
+                                             power_of_two)
+                # slots are empty when their length is all ones
+                at = _BUFFER_HEADER.size + 8 * capacity
+                for width in (key_width, value_width):
+                    stride = _SLOT_LENGTH.size + width
+                    mapped[at:at + capacity * stride] = \
+                        (_SLOT_LENGTH.pack(_EMPTY_SLOT) + bytes(width)) * capacity
+                    at += capacity * stride
+
+    def _map(self, path: str) -> None:
         """
-        Obtain next value and advance iterator
+        Maps the file at path and lays the map out over it
         """
+        with open(path, 'r+b') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0)
+        buffer = memoryview(self._mmap)
         try:
-            while self._index < self._capacity:
-                bucket = self._buckets[self._index]
-                self._index += 1
-                if bucket is not None:
-                    return bucket
-            raise StopIteration
-        except DynamicArrayException:
-            raise StopIteration
+            self._open(buffer)
+        except ValueError:
+            buffer.release()
+            self._mmap.close()
+            raise
+
+    def _unmap(self) -> None:
+        """
+        Releases the mapping, writing changed pages back first
+        """
+        buffer = self._buffer
+        self._release()
+        buffer.release()
+        self._mmap.flush()
+        self._mmap.close()
+
+    def _make_room(self, needed: int) -> None:
+        """
+        Rebuilds the map without the overflow bytes of replaced and removed
+        entries, growing the overflow area only once the live entries and
+        the write that did not fit take more than half of it
+        """
+        written = needed + self._overflow_size - self._overflow_used
+        self._rehash(self._capacity, max(self._overflow_size,
+                                         2 * (self._live_overflow() + written)))
+
+    def _rehash(self, new_capacity: int, overflow_size: int = None) -> None:
+        """
+        Places every live entry into a new file of exactly new_capacity,
+        then swaps it in for the old one
+        """
+        if overflow_size is None:
+            overflow_size = max(self._overflow_size, 2 * self._live_overflow())
+
+        rebuilt_path = self._path + '.rebuild'
+        self._create(rebuilt_path, new_capacity, self._function_name,
+                     self._key_width, self._value_width, overflow_size,
+                     self._tombstone_limit, self._power_of_two)
+        rebuilt = MappedHashMap(rebuilt_path)
+        rebuilt._probe_lengths = []
+        for index in self._live_slots():
+            rebuilt._place(self._keys[index], self._values[index],
+                           self._hashes[index])
+        rebuilt._size = self._size
+        probe_lengths = rebuilt._probe_lengths
+        rebuilt._unmap()
+
+        self._unmap()
+        os.replace(rebuilt_path, self._path)
+        self._map(self._path)
+        self._probe_lengths = probe_lengths
+        self._version += 1
+
+    def get_path(self) -> str:
+        """
+        Returns the path of the file holding the map
+        """
+        return self._path
+
+    def flush(self) -> None:
+        """
+        Writes changed pages of the map back to its file
+        """
+        self._mmap.flush()
+
+    def close(self) -> None:
+        """
+        Writes the map back to its file and unmaps it
+        """
+        self._unmap()
+
+    def __enter__(self) -> 'MappedHashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
 
 # ------------------- BASIC TESTING ---------------------------------------- #
@@ -1,66 +1,101 @@
 # By Milton Molina
 
-from a6_include import (DynamicArray, LinkedList,
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+from functools import wraps
+from heapq import heapify, heappop, heappush, heapreplace
+
+from a6_include import (DynamicArray, LinkedList, hash_batch,
+                        get_hash_function, mix_hash, is_prime, next_prime,
+                        pack_hashes, paused_gc, write_snapshot, read_snapshot,
                         hash_function_1, hash_function_2)
 
 
+def _unchanged(value: object) -> object:
+    """
+    Update function of setdefault, keeping the value it is given
+    """
+    return value
+
+
 class HashMap:
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 bucket_type: type = LinkedList,
+                 migrate_step: int = 0,
+                 power_of_two: bool = False) -> None:
         """
         Initialize new HashMap that uses
         separate chaining for collision resolution
-        """
-        self._buckets = DynamicArray()
 
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        function is a hash function or the name it is registered under
+        in a6_include.HASH_FUNCTIONS
+
+        bucket_type selects the bucket representation, either a LinkedList
+        of nodes or an ArrayBucket of parallel key/value lists
 
-        self._hash_function = function
+        migrate_step enables incremental resizing: the old bucket array is
+        kept after a resize and every put/get/contains_key/remove moves up to
+        migrate_step of its buckets into the new one. 0 rehashes all at once
+
+        power_of_two rounds capacities up to powers of two instead of primes
+        and picks buckets by masking a mixed hash rather than taking a modulo
+        """
+        # capacity must be a prime number, or a power of two if requested
+        # buckets are only allocated once a key lands in them
+        self._power_of_two = power_of_two
+        self._capacity = self._next_capacity(capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
+
+        self._hash_function = get_hash_function(function)
+        self._bucket_type = bucket_type
         self._size = 0
 
+        # number of buckets in the current array of every chain length,
+        # index 0 counting the empty ones, kept for stats()
+        self._chain_lengths = [self._capacity]
+
+        # bumped whenever keys are added or removed or the table is rebuilt,
+        # so iterators can tell the map changed under them
+        self._version = 0
+
+        # old bucket array still being drained by an incremental resize
+        self._migrate_step = migrate_step
+        self._old_buckets = None
+        self._migrated = 0
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
         """
         out = ''
         for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+            bucket = self._buckets[i]
+            if bucket is None:
+                bucket = self._bucket_type()
+            out += str(i) + ': ' + str(bucket) + '\n'
         return out
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number and the find the closest prime number
+        Find the closest prime number at or above the given number
+        Looked up in the prime table shared with the other HashMap
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
         Determine if given integer is a prime number and return boolean
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        return is_prime(capacity)
 
     def get_size(self) -> int:
         """
@@ -87,29 +122,61 @@ class HashMap:
         :param key: key being inserted
         :param value: value being inserted
         """
+        # computes value based on key
+        self._put(key, value, self._hash_function(key))
+
+    def _put(self, key: str, value: object, hash_result: int) -> None:
+        """
+        Same as put, for a key whose hash has already been computed
+        """
+        # an entry still waiting in the old array moves over with its new value
+        bucket = self._write_bucket(key, hash_result)[0]
+
+        # replace value when key matched, otherwise insert new key/value
+        if bucket.put(key, value, hash_result):
+            self._inserted(bucket)
+
+    def _write_bucket(self, key: str, hash_result: int) -> tuple:
+        """
+        Readies the table for writing key: runs a migration step, doubles
+        the capacity when the table is full and takes the key out of the
+        old array of a resize
+
+        :returns: A tuple of the key's bucket in the current array,
+                  allocated on first use, whether the key was taken out of
+                  the old array and its value there
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
+
         # when table is full, double the capacity
         if self.table_load() >= 1:
             self.resize_table(self._capacity * 2)
 
-        # computes value based on key
-        hash_result = self._hash_function(key)
-
-        # uses mod to assign value to an index in the array
-        hash_index = hash_result % self._capacity
-
-        # use the linked list at the calculated index
+        removed, value = False, None
+        if self._old_buckets is not None:
+            old_bucket = self._old_bucket(hash_result)
+            if old_bucket is not None:
+                removed, value = old_bucket.pop(key, hash_result)
+                if removed:
+                    self._size -= 1
+                    self._version += 1
+
+        # use the bucket at the calculated index, allocating it on first use
+        hash_index = self._index(hash_result, self._capacity)
         bucket = self._buckets.get_at_index(hash_index)
+        if bucket is None:
+            bucket = self._bucket_type()
+            self._buckets.set_at_index(hash_index, bucket)
+        return bucket, removed, value
 
-        # search for node in linked list containing the key
-        node = bucket.contains(key)
-
-        # when empty or value not found, insert new node with key/value
-        if node is None:
-            bucket.insert(key, value)
-            self._size += 1
-        # otherwise, key matched and value is replaced
-        else:
-            node.value = value
+    def _inserted(self, bucket) -> None:
+        """
+        Counts a key just added to bucket
+        """
+        self._size += 1
+        self._version += 1
+        self._chain_grew(bucket.length())
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -121,29 +188,121 @@ class HashMap:
         if new_capacity < 1:
             return
 
+        self._finish_migration()
+
         # takes care of resize_table(2)
         if new_capacity == 2:
             new_capacity *= 2
 
-        if not self._is_prime(new_capacity):
-            new_capacity = self._next_prime(new_capacity)
+        if self._power_of_two or not self._is_prime(new_capacity):
+            new_capacity = self._next_capacity(new_capacity)
 
-        # create empty hash with new capacity
-        new_da = HashMap(new_capacity, self._hash_function)
+        # keep doubling until every entry fits under a load factor of 1
+        # used to pass resize_table(1)
+        while new_capacity < self._size:
+            new_capacity = self._next_capacity(new_capacity * 2)
 
-        # copy buckets from old hash map to new hash map
-        for ind in range(self._buckets.length()):
-            bucket = self._buckets.get_at_index(ind)
-            for node in bucket:
-                new_da.put(node.key, node.value)
+        self._rehash(new_capacity)
 
-        # update capacity after potential resize from indirect recursion (?)
-        # used to pass resize_table(1)
-        new_capacity = new_da._capacity
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Swaps in a new bucket array of exactly new_capacity and moves every
+        entry into it, or only starts doing so in incremental mode
+        """
+        self._old_buckets = self._buckets
+        self._migrated = 0
 
         # update buckets reference and capacity
-        self._buckets = new_da._buckets
+        self._buckets = DynamicArray([None] * new_capacity)
         self._capacity = new_capacity
+        self._chain_lengths = [new_capacity]
+        self._version += 1
+
+        if not self._migrate_step:
+            self._finish_migration()
+
+    def _migrate(self, count: int) -> None:
+        """
+        Moves the next count buckets of the old array into the current one
+        Entries go straight into their new bucket using their cached hash,
+        without searching the bucket or checking the load factor
+        """
+        old_buckets = self._old_buckets
+        stop = min(self._migrated + count, old_buckets.length())
+
+        for ind in range(self._migrated, stop):
+            bucket = old_buckets.get_at_index(ind)
+            if bucket is None:
+                continue
+
+            for key, value, hash_result in bucket.entries():
+                hash_index = self._index(hash_result, self._capacity)
+                new_bucket = self._buckets.get_at_index(hash_index)
+                if new_bucket is None:
+                    new_bucket = self._bucket_type()
+                    self._buckets.set_at_index(hash_index, new_bucket)
+                # keys are unique, so there is nothing to replace
+                new_bucket.insert(key, value, hash_result)
+                self._chain_grew(new_bucket.length())
+            old_buckets.set_at_index(ind, None)
+
+        self._migrated = stop
+        if stop == old_buckets.length():
+            self._old_buckets = None
+
+    def _finish_migration(self) -> None:
+        """
+        Moves whatever is left of the old bucket array into the current one
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_buckets.length())
+
+    def _old_bucket(self, hash_result: int):
+        """
+        Returns the not yet migrated old bucket for a hash, or None
+        """
+        old_buckets = self._old_buckets
+        return old_buckets.get_at_index(
+            self._index(hash_result, old_buckets.length()))
+
+    def _next_capacity(self, capacity: int) -> int:
+        """
+        Returns the closest allowed capacity at or above capacity,
+        a power of two in power-of-two mode and a prime otherwise
+        """
+        if self._power_of_two:
+            return 1 << max(capacity - 1, 0).bit_length()
+        return self._next_prime(capacity)
+
+    def _index(self, hash_result: int, capacity: int) -> int:
+        """
+        Returns the bucket index of a hash in an array of the given capacity
+        """
+        if self._power_of_two:
+            return mix_hash(hash_result) & (capacity - 1)
+        return hash_result % capacity
+
+    def _chain_grew(self, length: int) -> None:
+        """
+        Records a bucket of the current array growing to length entries
+        """
+        lengths = self._chain_lengths
+        lengths[length - 1] -= 1
+        if length < len(lengths):
+            lengths[length] += 1
+        else:
+            lengths.append(1)
+
+    def _chain_shrank(self, length: int) -> None:
+        """
+        Records a bucket of the current array shrinking to length entries
+        Trailing zero counts are dropped so the last one is the longest chain
+        """
+        lengths = self._chain_lengths
+        lengths[length + 1] -= 1
+        lengths[length] += 1
+        while not lengths[-1]:
+            lengths.pop()
 
     def table_load(self) -> float:
         """
@@ -154,17 +313,30 @@ class HashMap:
     def empty_buckets(self) -> int:
         """
         Returns number of empty buckets in hash table
+        Answered from the counters, so polling it never finishes a resize;
+        during an incremental resize it only covers the current array
         """
-        count = 0
-        # iterate through array
-        for ind in range(self._buckets.length()):
-            # get the "bucket" (linked list) at the index
-            bucket = self._buckets.get_at_index(ind)
-            # check if empty, if so, increment count by 1
-            if bucket is None or bucket.length() == 0:
-                count += 1
+        return self._chain_lengths[0]
 
-        return count
+    def stats(self) -> dict:
+        """
+        Returns occupancy statistics of the current bucket array from
+        counters kept up to date on every change, so no table walk is needed
+
+        empty_buckets, occupied_buckets and longest_chain only cover the
+        current array; buckets an incremental resize has not moved yet
+        are left out
+        """
+        empty = self._chain_lengths[0]
+        return {
+            'size': self._size,
+            'capacity': self._capacity,
+            'table_load': self.table_load(),
+            'empty_buckets': empty,
+            'occupied_buckets': self._capacity - empty,
+            'longest_chain': len(self._chain_lengths) - 1,
+            'resizing': self._old_buckets is not None,
+        }
 
     def get(self, key: str):
         """
@@ -172,23 +344,33 @@ class HashMap:
         If not in hash map, returns None
         """
         # computes bucket using hash function
-        hash_result = self._hash_function(key)
+        return self._get(key, self._hash_function(key))
 
-        # uses mod to arrive at correct index
-        hash_index = hash_result % self._capacity
+    def _get(self, key: str, hash_result: int):
+        """
+        Same as get, for a key whose hash has already been computed
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
 
-        # use the linked list at the calculated index
+        # arrive at correct index
+        hash_index = self._index(hash_result, self._capacity)
+
+        # use the bucket at the calculated index
         bucket = self._buckets.get_at_index(hash_index)
 
-        # search for node in linked list containing the key
-        node = bucket.contains(key)
+        # value returned (None if key is not in the bucket)
+        value = None
+        if bucket is not None:
+            value = bucket.get(key, None, hash_result)
 
-        # when empty or value not found:
-        if node is None:
-            return None
-        # otherwise, key matched and value returned
-        else:
-            return node.value
+        # key may still be waiting in the old array during a resize
+        if value is None and self._old_buckets is not None:
+            bucket = self._old_bucket(hash_result)
+            if bucket is not None:
+                value = bucket.get(key, None, hash_result)
+
+        return value
 
     def contains_key(self, key: str) -> bool:
         """
@@ -197,23 +379,32 @@ class HashMap:
         :param key: what is being searched for
         """
         # computes bucket based on key
-        hash_result = self._hash_function(key)
+        return self._contains_key(key, self._hash_function(key))
 
-        # uses mod operator to navigate to index
-        hash_index = hash_result % self._capacity
+    def _contains_key(self, key: str, hash_result: int) -> bool:
+        """
+        Same as contains_key, for a key whose hash has already been computed
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
 
-        # use the linked list at the calculated index
+        # navigate to index
+        hash_index = self._index(hash_result, self._capacity)
+
+        # use the bucket at the calculated index
         bucket = self._buckets.get_at_index(hash_index)
 
-        # search for node in linked list containing the key
-        node = bucket.contains(key)
+        # key matched
+        if bucket is not None and bucket.contains(key, hash_result):
+            return True
+
+        # key may still be waiting in the old array during a resize
+        if self._old_buckets is not None:
+            bucket = self._old_bucket(hash_result)
+            return bucket is not None and bool(bucket.contains(key, hash_result))
 
         # when empty or value not found
-        if node is None:
-            return False
-        # otherwise, key matched
-        else:
-            return True
+        return False
 
     def remove(self, key: str) -> None:
         """
@@ -221,24 +412,138 @@ class HashMap:
         If key not in hash map, nothing happens
         """
         # computes bucket based on key
-        hash_result = self._hash_function(key)
+        self._remove(key, self._hash_function(key))
+
+    def _remove(self, key: str, hash_result: int) -> None:
+        """
+        Same as remove, for a key whose hash has already been computed
+        """
+        self._pop(key, hash_result)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes given key from hash map and returns its value
+        If key not in hash map, returns default
+        """
+        return self._pop(key, self._hash_function(key), default)
+
+    def _pop(self, key: str, hash_result: int, default: object = None) -> object:
+        """
+        Same as pop, for a key whose hash has already been computed
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
 
-        # uses mod operator to navigate to index
-        hash_index = hash_result % self._capacity
+        # navigate to index
+        hash_index = self._index(hash_result, self._capacity)
 
-        # use the linked list at the calculated index
+        # use the bucket at the calculated index
         bucket = self._buckets.get_at_index(hash_index)
 
-        # search for node in linked list containing the key
-        node = bucket.contains(key)
+        # remove key and its value when found
+        if bucket is not None:
+            removed, value = bucket.pop(key, hash_result)
+            if removed:
+                self._size -= 1
+                self._version += 1
+                self._chain_shrank(bucket.length())
+                return value
+
+        # key may still be waiting in the old array during a resize
+        if self._old_buckets is not None:
+            bucket = self._old_bucket(hash_result)
+            if bucket is not None:
+                removed, value = bucket.pop(key, hash_result)
+                if removed:
+                    self._size -= 1
+                    self._version += 1
+                    return value
+
+        return default
+
+    def update_with(self, key: str, function: callable,
+                    default: object = None) -> object:
+        """
+        Replaces the value of given key by function(value), or adds the key
+        with value function(default) when it is not in hash map
+        Returns the new value
+        """
+        return self._update(key, function, default, self._hash_function(key))
 
-        # when empty, key can't be removed
-        if node is None:
-            return
-        # otherwise, remove key and its value
-        else:
-            bucket.remove(key)
-            self._size -= 1
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value of given key, counting from 0 when the key
+        is not in hash map
+        Returns the new value
+        """
+        return self._update(key, lambda value: value + delta, 0,
+                            self._hash_function(key))
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of given key, adding it with value default first
+        when it is not in hash map
+        """
+        return self._update(key, _unchanged, default, self._hash_function(key))
+
+    def _update(self, key: str, function: callable, default: object,
+                hash_result: int) -> object:
+        """
+        Same as update_with, for a key whose hash has already been computed
+        The key's bucket is walked once, whether the key is found or added
+        """
+        # an entry still waiting in the old array moves over, and its value
+        # stands in for default
+        bucket, removed, value = self._write_bucket(key, hash_result)
+        if removed:
+            default = value
+
+        inserted, value = bucket.update(key, function, default, hash_result)
+        if inserted:
+            self._inserted(bucket)
+        return value
+
+    def put_many(self, keys: list, values: list) -> None:
+        """
+        Puts every key with the value at the same position in values
+        The table is sized once for the whole batch and all keys are hashed
+        together, so no resize happens part way through
+
+        :param keys: keys being inserted
+        :param values: values being inserted, one per key
+        """
+        # room for every key without going over a load factor of 1
+        if self._size + len(keys) > self._capacity:
+            self.resize_table(self._size + len(keys))
+        self._finish_migration()
+
+        for key, value, hash_result in zip(keys, values,
+                                           hash_batch(self._hash_function, keys)):
+            self._put(key, value, hash_result)
+
+    def get_many(self, keys: list) -> DynamicArray:
+        """
+        Returns DynamicArray with the value of every key, None where absent
+        """
+        self._finish_migration()
+        return DynamicArray([self._get(key, hash_result) for key, hash_result
+                             in zip(keys, hash_batch(self._hash_function, keys))])
+
+    def contains_many(self, keys: list) -> DynamicArray:
+        """
+        Returns DynamicArray with True for every key in the hash map, False otherwise
+        """
+        self._finish_migration()
+        return DynamicArray([self._contains_key(key, hash_result) for key, hash_result
+                             in zip(keys, hash_batch(self._hash_function, keys))])
+
+    def remove_many(self, keys: list) -> None:
+        """
+        Removes every key in keys, skipping those not in the hash map
+        """
+        self._finish_migration()
+        for key, hash_result in zip(keys, hash_batch(self._hash_function, keys)):
+            self._remove(key, hash_result)
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -248,18 +553,19 @@ class HashMap:
         # initialize dynamic array object
         tuple_da = DynamicArray()
 
-        for ind in range(self._buckets.length()):
-            bucket = self._buckets.get_at_index(ind)
-            # when not empty, iterate thru the linked list
-            for node in bucket:
-                node_key = node.key
-                node_val = node.value
-
-                # save tuple to variable
-                pair = node_key, node_val
+        # entries not yet migrated by a resize are still in the old array
+        for buckets in (self._buckets, self._old_buckets):
+            if buckets is None:
+                continue
 
-                # append pair to dynamic array object
-                tuple_da.append(pair)
+            for ind in range(buckets.length()):
+                bucket = buckets.get_at_index(ind)
+                # when not empty, iterate thru the bucket
+                if bucket is None:
+                    continue
+                for pair in bucket.items():
+                    # append pair to dynamic array object
+                    tuple_da.append(pair)
 
         # returns dynamic array with key/values as tuples
         return tuple_da
@@ -268,34 +574,360 @@ class HashMap:
         """
         Clears hash map contents
         """
-        cap = self._capacity
-        new_da = HashMap(cap, self._hash_function)
-        self._buckets = new_da._buckets
+        # fresh empty bucket array of the same capacity
+        self._buckets = DynamicArray([None] * self._capacity)
+        self._chain_lengths = [self._capacity]
+        self._old_buckets = None
         self._size = 0
+        self._version += 1
+
+    def dump(self, file) -> None:
+        """
+        Writes the hash map to an open binary file: its capacity, options,
+        hash function and the bucket index, cached hash, key and value of
+        every entry, so load() can rebuild the buckets without hashing
+        """
+        self._finish_migration()
+        indices, hashes, keys, values = array('Q'), [], [], []
+        for ind in range(self._capacity):
+            bucket = self._buckets.get_at_index(ind)
+            if bucket is None:
+                continue
+            for key, value, hash_result in bucket.entries():
+                indices.append(ind)
+                hashes.append(hash_result)
+                keys.append(key)
+                values.append(value)
+
+        header = {'capacity': self._capacity,
+                  'bucket_type': self._bucket_type,
+                  'migrate_step': self._migrate_step,
+                  'power_of_two': self._power_of_two,
+                  'chain_lengths': self._chain_lengths}
+        write_snapshot(file, 'separate chaining', self._hash_function, header,
+                       indices, pack_hashes(hashes), keys, values)
+
+    @classmethod
+    def load(cls, file, function=None) -> 'HashMap':
+        """
+        Returns the hash map dump() wrote to an open binary file
+        Entries go straight back into their buckets with their cached hashes;
+        only when the hash function differs in this process, like the salted
+        'builtin' and 'siphash', are the keys hashed and put again
+        Only load trusted files, keys and values are unpickled
+
+        :param function: hash function replacing the one the map was dumped
+                         with, required if that one is not registered by name
+        """
+        header, columns, function, hashes_valid = read_snapshot(
+            file, 'separate chaining', function)
+        indices, hashes, keys, values = columns
+        map = cls(header['capacity'], function, header['bucket_type'],
+                  header['migrate_step'], header['power_of_two'])
+        if not hashes_valid:
+            map.put_many(keys, values)
+            return map
+
+        buckets, bucket_type = [None] * map._capacity, map._bucket_type
+        with paused_gc():
+            for ind, hash_result, key, value in zip(indices, hashes, keys,
+                                                    values):
+                bucket = buckets[ind]
+                if bucket is None:
+                    bucket = buckets[ind] = bucket_type()
+                bucket.insert(key, value, hash_result)
+
+        map._buckets = DynamicArray(buckets)
+        map._chain_lengths = header['chain_lengths']
+        map._size = len(keys)
+        return map
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key in the hash map
+        Every call starts its own pass over the buckets without copying them
+        Raises RuntimeError if keys are added or removed during the pass
+        """
+        self._finish_migration()
+        version = self._version
+        buckets = self._buckets
+
+        for ind in range(buckets.length()):
+            bucket = buckets.get_at_index(ind)
+            if bucket is None:
+                continue
+            for pair in bucket.items():
+                yield pair
+                if self._version != version:
+                    raise RuntimeError('hash map changed size during iteration')
+
+    def keys(self):
+        """
+        Yields every key in the hash map, see items()
+        """
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        """
+        Yields every value in the hash map, see items()
+        """
+        for _, value in self.items():
+            yield value
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the hash map, like a dict
+        """
+        return self.keys()
+
+
+class ConcurrentHashMap:
+    """
+    Thread-safe HashMap split into stripes, each an independent HashMap
+    guarded by its own lock; a key's hash picks its stripe, so threads
+    working on different stripes never wait for each other
+
+    Operations on one key hash it before taking any lock and then hold
+    only the lock of its stripe. A stripe that outgrows its capacity
+    resizes under its own lock, leaving the other stripes available.
+    resize_table, clear, get_size and the other whole-map operations take
+    every lock, always in stripe order, and see a consistent snapshot
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 stripes: int = 16,
+                 bucket_type: type = LinkedList,
+                 migrate_step: int = 0,
+                 power_of_two: bool = False) -> None:
+        """
+        Initialize new ConcurrentHashMap of stripes HashMaps sharing
+        capacity between them; the other arguments are passed to every
+        stripe, see HashMap
+        """
+        self._hash_function = get_hash_function(function)
+        self._stripes = DynamicArray()
+        self._locks = []
+        for _ in range(stripes):
+            self._stripes.append(HashMap(-(-capacity // stripes),
+                                         self._hash_function, bucket_type,
+                                         migrate_step, power_of_two))
+            self._locks.append(threading.Lock())
+
+    def _stripe(self, hash_result: int) -> tuple:
+        """
+        Returns the (lock, HashMap) pair a hash belongs to
+        """
+        index = hash_result % self._stripes.length()
+        return self._locks[index], self._stripes.get_at_index(index)
+
+    @contextmanager
+    def _all_locks(self):
+        """
+        Holds the lock of every stripe for the duration of a with block
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds key/value pair to hash map, replacing the value if key exists
+        """
+        hash_result = self._hash_function(key)
+        lock, stripe = self._stripe(hash_result)
+        with lock:
+            stripe._put(key, value, hash_result)
+
+    def get(self, key: str):
+        """
+        Returns value associated with given key, or None if it is not found
+        """
+        hash_result = self._hash_function(key)
+        lock, stripe = self._stripe(hash_result)
+        with lock:
+            return stripe._get(key, hash_result)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key is in hash map, otherwise returns False
+        """
+        hash_result = self._hash_function(key)
+        lock, stripe = self._stripe(hash_result)
+        with lock:
+            return stripe._contains_key(key, hash_result)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes given key and its value from hash map
+        If key not in hash map, nothing happens
+        """
+        hash_result = self._hash_function(key)
+        lock, stripe = self._stripe(hash_result)
+        with lock:
+            stripe._remove(key, hash_result)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes given key from hash map and returns its value
+        If key not in hash map, returns default
+        """
+        hash_result = self._hash_function(key)
+        lock, stripe = self._stripe(hash_result)
+        with lock:
+            return stripe._pop(key, hash_result, default)
+
+    def update_with(self, key: str, function: callable,
+                    default: object = None) -> object:
+        """
+        Replaces the value of given key by function(value), or adds the key
+        with value function(default), as one atomic step
+        function runs while the key's stripe is locked
+        Returns the new value
+        """
+        hash_result = self._hash_function(key)
+        lock, stripe = self._stripe(hash_result)
+        with lock:
+            return stripe._update(key, function, default, hash_result)
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Atomically adds delta to the value of given key, counting from 0
+        when the key is not in hash map
+        Returns the new value
+        """
+        return self.update_with(key, lambda value: value + delta, 0)
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of given key, atomically adding it with value
+        default first when it is not in hash map
+        """
+        return self.update_with(key, _unchanged, default)
+
+    def get_size(self) -> int:
+        """
+        Returns the number of keys in hash map at one point in time
+        """
+        with self._all_locks():
+            return sum(self._stripes.get_at_index(ind).get_size()
+                       for ind in range(self._stripes.length()))
+
+    def get_capacity(self) -> int:
+        """
+        Returns the number of buckets of all stripes together
+        """
+        with self._all_locks():
+            return sum(self._stripes.get_at_index(ind).get_capacity()
+                       for ind in range(self._stripes.length()))
+
+    def table_load(self) -> float:
+        """
+        Returns current hash table load factor
+        """
+        with self._all_locks():
+            size = capacity = 0
+            for ind in range(self._stripes.length()):
+                stripe = self._stripes.get_at_index(ind)
+                size += stripe.get_size()
+                capacity += stripe.get_capacity()
+            return size / capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns number of empty buckets of all stripes together
+        """
+        with self._all_locks():
+            return sum(self._stripes.get_at_index(ind).empty_buckets()
+                       for ind in range(self._stripes.length()))
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes every stripe to its share of new_capacity while all of them
+        are locked, so no operation sees the map half resized
+        """
+        if new_capacity < 1:
+            return
+
+        with self._all_locks():
+            share = -(-new_capacity // self._stripes.length())
+            for ind in range(self._stripes.length()):
+                self._stripes.get_at_index(ind).resize_table(share)
+
+    def clear(self) -> None:
+        """
+        Clears hash map contents
+        """
+        with self._all_locks():
+            for ind in range(self._stripes.length()):
+                self._stripes.get_at_index(ind).clear()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns dynamic array object of (key, value) tuples for every key
+        in hash map at one point in time
+        """
+        tuple_da = DynamicArray()
+        with self._all_locks():
+            for ind in range(self._stripes.length()):
+                pairs = self._stripes.get_at_index(ind).get_keys_and_values()
+                for pair_ind in range(pairs.length()):
+                    tuple_da.append(pairs.get_at_index(pair_ind))
+        return tuple_da
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key in hash map
+        Pairs come from a snapshot, so other threads may keep changing the
+        map while it is iterated
+        """
+        pairs = self.get_keys_and_values()
+        for ind in range(pairs.length()):
+            yield pairs.get_at_index(ind)
+
+    def keys(self):
+        """
+        Yields every key in hash map, see items()
+        """
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        """
+        Yields every value in hash map, see items()
+        """
+        for _, value in self.items():
+            yield value
 
+    def __iter__(self):
+        """
+        Iterates over the keys of hash map, like a dict
+        """
+        return self.keys()
 
-def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
+
+def find_mode(da: DynamicArray,
+              function: callable = hash_function_1) -> tuple[DynamicArray, int]:
     """
     Receives sorted or unsorted array and finds the mode.
     Use hashmap to get frequency of keys
 
     :param da: DynamicArray object being used
+    :param function: hash function of the frequency map, or its registered name
 
     :returns: A tuple consisting of the mode and frequency.
     """
-    map = HashMap()
+    map = HashMap(function=function)
 
-    # iterate through input array
+    # count each key, finding its bucket only once
     for ind in range(da.length()):
-        key = da.get_at_index(ind)
-        # when key is in hashmap, get and incr. val
-        if map.contains_key(key):
-            val = map.get(key)
-            val += 1
-            map.put(key, val)
-        # otherwise, add to hashmap with value of 1
-        else:
-            map.put(key, 1)
+        map.increment(da.get_at_index(ind))
 
     # places keys and values in dynamic array
     new_da = map.get_keys_and_values()
@@ -322,6 +954,767 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
 
     return mode_arr, freq
 
+
+class HeavyHitters:
+    """
+    Streaming frequency summary using the Space-Saving algorithm
+    At most counters keys are monitored at a time; when a new key arrives
+    and all counters are taken, the key with the smallest count is evicted
+    and the newcomer inherits that count plus one, remembered as its error.
+
+    After total keys have been added:
+    - every key seen more than total / counters times is monitored
+    - a monitored key's count overestimates its true frequency by at most
+      its error, which is never more than total / counters
+
+    counters=None never evicts, giving exact counts in unbounded memory
+    """
+
+    def __init__(self, counters: int = 1000, function='builtin') -> None:
+        """
+        Initialize an empty summary of at most counters monitored keys
+        function hashes keys for the counter map, see HashMap
+        """
+        if counters is not None and counters < 1:
+            raise ValueError('counters must be at least 1')
+        self._limit = counters
+        self._total = 0
+
+        # key -> [count, error]
+        self._counters = HashMap(counters or 11, function)
+        self._hash_function = self._counters._hash_function
+
+        # one (count, sequence, key) triple per monitored key; a triple goes
+        # stale when its key is counted again and is only brought up to date
+        # once it reaches the top, since counts never decrease. The sequence
+        # breaks ties so keys of different types are never compared
+        self._heap = []
+        self._sequence = itertools.count()
+
+    def get_total(self) -> int:
+        """
+        Return number of keys added so far
+        """
+        return self._total
+
+    def add(self, key: object) -> None:
+        """
+        Counts one occurrence of key
+        """
+        self.update((key,))
+
+    def update(self, stream) -> None:
+        """
+        Counts every key of an iterable of any length, consuming it lazily
+        """
+        counters, heap, limit = self._counters, self._heap, self._limit
+        hash_function = self._hash_function
+        sequence = self._sequence
+
+        for key in stream:
+            self._total += 1
+            hash_result = hash_function(key)
+            counter = counters._get(key, hash_result)
+
+            # already monitored
+            if counter is not None:
+                counter[0] += 1
+                continue
+
+            # free counter left
+            if limit is None or counters.get_size() < limit:
+                counters._put(key, [1, 0], hash_result)
+                if limit is not None:
+                    heappush(heap, (1, next(sequence), key))
+                continue
+
+            # bring the smallest triple up to date before evicting its key
+            count, _, victim = heap[0]
+            current = counters.get(victim)[0]
+            while current != count:
+                heapreplace(heap, (current, next(sequence), victim))
+                count, _, victim = heap[0]
+                current = counters.get(victim)[0]
+
+            counters.remove(victim)
+            counters._put(key, [count + 1, count], hash_result)
+            heapreplace(heap, (count + 1, next(sequence), key))
+
+    def top(self, n: int = None) -> DynamicArray:
+        """
+        Returns DynamicArray of (key, count, error) tuples for the n keys
+        with the highest counts, or every monitored key, highest first
+        """
+        ranked = sorted(((key, count, error) for key, (count, error)
+                         in self._counters.items()),
+                        key=lambda entry: entry[1], reverse=True)
+        return DynamicArray(ranked if n is None else ranked[:n])
+
+    def mode(self) -> tuple[DynamicArray, int, int]:
+        """
+        Returns the keys with the highest count, that count and the most it
+        may exceed their true frequency; the count is exact when that is 0
+        """
+        mode_arr = DynamicArray()
+        freq = error = 0
+
+        for key, (count, key_error) in self._counters.items():
+            # a higher count starts a new mode array
+            if count > freq:
+                mode_arr = DynamicArray()
+                freq, error = count, 0
+            if count == freq:
+                mode_arr.append(key)
+                error = max(error, key_error)
+
+        return mode_arr, freq, error
+
+
+def find_mode_stream(stream, counters: int = 1000,
+                     function='builtin') -> tuple[DynamicArray, int, int]:
+    """
+    Finds the mode of an iterable of any length in memory bounded by counters
+    See HeavyHitters for the guarantees; counters=None counts exactly
+
+    :param stream: keys to count, consumed lazily
+    :param counters: number of keys monitored at once
+
+    :returns: A tuple of the modes, their frequency and the most that
+              frequency may exceed the true one
+    """
+    hitters = HeavyHitters(counters, function)
+    hitters.update(stream)
+    return hitters.mode()
+
+
+class _CacheEntry:
+    """
+    Cached key/value pair with its hash, linked into the recency list of
+    an LRU cache or into the list of its use-count group in an LFU cache
+    """
+    __slots__ = ('key', 'value', 'hash', 'prev', 'next', 'group')
+
+    def __init__(self, key: object = None, value: object = None,
+                 hash_result: int = 0) -> None:
+        self.key = key
+        self.value = value
+        self.hash = hash_result
+        self.prev = self.next = self
+
+
+class _UseGroup:
+    """
+    The entries of an LFU cache used count times, most recently used first,
+    linked into the list of groups in increasing count order
+    """
+    __slots__ = ('count', 'entries', 'prev', 'next')
+
+    def __init__(self, count: int = 0) -> None:
+        self.count = count
+        self.entries = _CacheEntry()
+        self.prev = self.next = self
+
+
+def _unlink(node) -> None:
+    """
+    Takes a node out of its circular doubly linked list
+    """
+    node.prev.next = node.next
+    node.next.prev = node.prev
+
+
+def _link_after(node, anchor) -> None:
+    """
+    Links a node into a circular doubly linked list right after anchor
+    """
+    node.prev = anchor
+    node.next = anchor.next
+    anchor.next.prev = node
+    anchor.next = node
+
+
+class CacheHashMap:
+    """
+    Cache of at most maxsize keys, evicting one in O(1) when a new key
+    arrives while it is full
+
+    Entries live in a HashMap and are linked straight through each other,
+    so a hit costs one lookup plus a few pointer updates:
+    - 'lru' keeps one recency list and evicts the least recently used key
+    - 'lfu' keeps a list of groups of entries with the same use count and
+      evicts the least recently used key of the lowest count
+
+    Only get counts as a use, and as a hit or a miss; contains_key, put
+    and iteration leave both the order and the counters alone
+    """
+
+    def __init__(self, maxsize: int = 128, policy: str = 'lru',
+                 function='builtin', bucket_type: type = LinkedList) -> None:
+        """
+        Initialize an empty cache of at most maxsize keys
+        function and bucket_type are used by the underlying HashMap, which
+        is sized so that it never resizes
+        """
+        if maxsize < 1:
+            raise ValueError('cache maxsize must be at least 1')
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"unknown cache policy {policy!r}, "
+                             f"expected 'lru' or 'lfu'")
+
+        self._maxsize = maxsize
+        self._lfu = policy == 'lfu'
+        self._map = HashMap(maxsize, function, bucket_type)
+        self._hash_function = self._map._hash_function
+
+        # sentinel of the recency list, or of the list of use-count groups
+        self._entries = _CacheEntry()
+        self._groups = _UseGroup()
+
+        self._hits = self._misses = self._evictions = 0
+
+    def _use(self, entry: _CacheEntry) -> None:
+        """
+        Records a use of entry, moving it to the front of the recency list
+        or into the group of the next use count
+        """
+        _unlink(entry)
+        if not self._lfu:
+            _link_after(entry, self._entries)
+            return
+
+        group = entry.group
+        target = group.next
+        if target.count != group.count + 1:
+            target = _UseGroup(group.count + 1)
+            _link_after(target, group)
+        _link_after(entry, target.entries)
+        entry.group = target
+
+        if group.entries.next is group.entries:
+            _unlink(group)
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used key, of the lowest use count for LFU
+        """
+        if self._lfu:
+            group = self._groups.next
+            victim = group.entries.prev
+            _unlink(victim)
+            if group.entries.next is group.entries:
+                _unlink(group)
+        else:
+            victim = self._entries.prev
+            _unlink(victim)
+
+        self._map._remove(victim.key, victim.hash)
+        self._evictions += 1
+
+    def _lookup(self, key: object, hash_result: int):
+        """
+        Returns the entry of key after recording a use and a hit, or None
+        after recording a miss
+        """
+        entry = self._map._get(key, hash_result)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._use(entry)
+        return entry
+
+    def _store(self, key: object, value: object, hash_result: int) -> None:
+        """
+        Same as put, for a key whose hash has already been computed
+        """
+        entry = self._map._get(key, hash_result)
+        if entry is not None:
+            entry.value = value
+            return
+
+        if self._map.get_size() >= self._maxsize:
+            self._evict()
+
+        entry = _CacheEntry(key, value, hash_result)
+        if self._lfu:
+            group = self._groups.next
+            if group.count != 1:
+                group = _UseGroup(1)
+                _link_after(group, self._groups)
+            _link_after(entry, group.entries)
+            entry.group = group
+        else:
+            _link_after(entry, self._entries)
+        self._map._put(key, entry, hash_result)
+
+    def get(self, key: object, default: object = None) -> object:
+        """
+        Returns value associated with given key, counting a use and a hit,
+        or default after counting a miss
+        """
+        entry = self._lookup(key, self._hash_function(key))
+        return default if entry is None else entry.value
+
+    def put(self, key: object, value: object) -> None:
+        """
+        Adds key/value pair to the cache, replacing the value if key exists
+        A new key evicts another first when the cache is full
+        """
+        self._store(key, value, self._hash_function(key))
+
+    def contains_key(self, key: object) -> bool:
+        """
+        Returns True if key is cached, without counting a use
+        """
+        return self._map.contains_key(key)
+
+    def pop(self, key: object, default: object = None) -> object:
+        """
+        Removes given key from the cache and returns its value
+        If key not cached, returns default
+        """
+        entry = self._map.pop(key)
+        if entry is None:
+            return default
+
+        _unlink(entry)
+        if self._lfu and entry.group.entries.next is entry.group.entries:
+            _unlink(entry.group)
+        return entry.value
+
+    def remove(self, key: object) -> None:
+        """
+        Removes given key and its value from the cache
+        If key not cached, nothing happens
+        """
+        self.pop(key)
+
+    def clear(self) -> None:
+        """
+        Empties the cache, keeping its counters
+        """
+        self._map.clear()
+        self._entries = _CacheEntry()
+        self._groups = _UseGroup()
+
+    def get_size(self) -> int:
+        """
+        Return number of cached keys
+        """
+        return self._map.get_size()
+
+    def get_maxsize(self) -> int:
+        """
+        Return most keys the cache holds before evicting
+        """
+        return self._maxsize
+
+    def stats(self) -> dict:
+        """
+        Returns the hit, miss and eviction counts with the cache occupancy
+        """
+        lookups = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'hit_rate': self._hits / lookups if lookups else 0.0,
+            'size': self._map.get_size(),
+            'maxsize': self._maxsize,
+            'policy': 'lfu' if self._lfu else 'lru',
+        }
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every cached key, next to be
+        evicted last
+        """
+        if not self._lfu:
+            entry = self._entries.next
+            while entry is not self._entries:
+                yield entry.key, entry.value
+                entry = entry.next
+            return
+
+        group = self._groups.prev
+        while group is not self._groups:
+            entry = group.entries.next
+            while entry is not group.entries:
+                yield entry.key, entry.value
+                entry = entry.next
+            group = group.prev
+
+    def keys(self):
+        """
+        Yields every cached key, next to be evicted last
+        """
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        """
+        Yields every cached value, next to be evicted last
+        """
+        for _, value in self.items():
+            yield value
+
+    def __iter__(self):
+        """
+        Iterates over the cached keys, like a dict
+        """
+        return self.keys()
+
+
+# separates positional from keyword arguments in memoize keys
+_KEYWORDS = object()
+
+
+def memoize(maxsize: int = 128, policy: str = 'lru'):
+    """
+    Decorator caching the results of a function in a CacheHashMap, keyed
+    by its arguments, which must be hashable; the cache is available as
+    the cache attribute of the decorated function
+
+    :param maxsize: most results kept before evicting
+    :param policy: 'lru' or 'lfu', see CacheHashMap
+    """
+    def decorator(function: callable) -> callable:
+        cache = CacheHashMap(maxsize, policy, 'builtin')
+        hash_function = cache._hash_function
+
+        @wraps(function)
+        def cached(*args, **kwargs):
+            key = args
+            if kwargs:
+                key += (_KEYWORDS,) + tuple(sorted(kwargs.items()))
+
+            hash_result = hash_function(key)
+            entry = cache._lookup(key, hash_result)
+            if entry is not None:
+                return entry.value
+
+            value = function(*args, **kwargs)
+            cache._store(key, value, hash_result)
+            return value
+
+        cached.cache = cache
+        return cached
+
+    return decorator
+
+
+class _ExpiringEntry:
+    """
+    Value of an ExpiringHashMap key with its hash and the clock time it
+    expires at, None for never
+    """
+    __slots__ = ('key', 'value', 'hash', 'deadline')
+
+    def __init__(self, key: str, value: object, hash_result: int,
+                 deadline: float) -> None:
+        self.key = key
+        self.value = value
+        self.hash = hash_result
+        self.deadline = deadline
+
+
+class ExpiringHashMap:
+    """
+    HashMap whose keys can expire a given number of seconds after their put
+
+    An expired key is treated as absent straight away and its entry is
+    reclaimed lazily: by the get, contains_key or pop that finds it, or
+    by the sweeper, a heap of deadlines that sweep() drains a bounded
+    number of keys at a time. Every put runs one sweep step of sweep_step
+    keys, so a map that keeps being written cleans itself up without ever
+    walking the table.
+
+    A key put again or removed leaves its old deadline in the heap; the
+    sweeper skips it, and the heap is rebuilt from the live deadlines once
+    stale ones outnumber them.
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 default_ttl: float = None,
+                 sweep_step: int = 16,
+                 clock: callable = time.monotonic,
+                 bucket_type: type = LinkedList) -> None:
+        """
+        Initialize an empty map whose keys live default_ttl seconds unless
+        put gives them a ttl of their own, or forever when both are None
+
+        clock returns the current time in seconds; capacity, function and
+        bucket_type are used by the underlying HashMap
+        """
+        self._map = HashMap(capacity, function, bucket_type)
+        self._hash_function = self._map._hash_function
+        self._default_ttl = default_ttl
+        self._sweep_step = sweep_step
+        self._clock = clock
+
+        # (deadline, sequence, entry) for every key put with a ttl; the
+        # sequence keeps entries of equal deadlines from being compared
+        self._deadlines = []
+        self._sequence = 0
+
+    def _live(self, key: str, hash_result: int, now: float):
+        """
+        Returns the entry of key, or None if it is absent or expired,
+        reclaiming an expired one
+        """
+        entry = self._map._get(key, hash_result)
+        if entry is None or entry.deadline is None or entry.deadline > now:
+            return entry
+        self._map._remove(key, hash_result)
+        return None
+
+    def put(self, key: str, value: object, ttl: float = None) -> None:
+        """
+        Adds key/value pair to the map, replacing the value if key exists
+        The key expires ttl seconds from now, default_ttl if ttl is None
+        """
+        now = self._clock()
+        if self._sweep_step:
+            self._sweep(self._sweep_step, now)
+
+        if ttl is None:
+            ttl = self._default_ttl
+        deadline = None if ttl is None else now + ttl
+
+        hash_result = self._hash_function(key)
+        entry = _ExpiringEntry(key, value, hash_result, deadline)
+        self._map._put(key, entry, hash_result)
+
+        if deadline is not None:
+            heappush(self._deadlines, (deadline, self._sequence, entry))
+            self._sequence += 1
+            if len(self._deadlines) > 2 * self._map.get_size() + 64:
+                self._rebuild_deadlines()
+
+    def _rebuild_deadlines(self) -> None:
+        """
+        Rebuilds the heap from the deadlines of the keys still in the map
+        """
+        self._deadlines = [(entry.deadline, sequence, entry) for sequence, entry
+                           in enumerate(self._map.values())
+                           if entry.deadline is not None]
+        self._sequence = len(self._deadlines)
+        heapify(self._deadlines)
+
+    def sweep(self, limit: int = None) -> int:
+        """
+        Removes expired keys, looking at no more than limit deadlines,
+        or at every deadline that has passed when limit is None
+
+        :returns: The number of keys removed
+        """
+        return self._sweep(limit, self._clock())
+
+    def _sweep(self, limit: int, now: float) -> int:
+        """
+        Same as sweep, for the time now
+        """
+        deadlines, map = self._deadlines, self._map
+        removed = 0
+        while deadlines and deadlines[0][0] <= now and limit != 0:
+            entry = heappop(deadlines)[2]
+            # skip deadlines of keys since put again or removed
+            if map._get(entry.key, entry.hash) is entry:
+                map._remove(entry.key, entry.hash)
+                removed += 1
+            if limit is not None:
+                limit -= 1
+        return removed
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns value associated with given key, or default if it is not
+        in the map or has expired
+        """
+        entry = self._live(key, self._hash_function(key), self._clock())
+        return default if entry is None else entry.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key is in the map and has not expired
+        """
+        return self._live(key, self._hash_function(key),
+                          self._clock()) is not None
+
+    def ttl(self, key: str) -> float:
+        """
+        Returns the seconds left before key expires, or None if it never
+        does or is not in the map
+        """
+        now = self._clock()
+        entry = self._live(key, self._hash_function(key), now)
+        if entry is None or entry.deadline is None:
+            return None
+        return entry.deadline - now
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes given key from the map and returns its value
+        If key not in the map or expired, returns default
+        """
+        entry = self._map.pop(key)
+        if entry is None or (entry.deadline is not None
+                             and entry.deadline <= self._clock()):
+            return default
+        return entry.value
+
+    def remove(self, key: str) -> None:
+        """
+        Removes given key and its value from the map
+        If key not in the map, nothing happens
+        """
+        self._map.remove(key)
+
+    def clear(self) -> None:
+        """
+        Clears the map contents and pending deadlines
+        """
+        self._map.clear()
+        self._deadlines = []
+        self._sequence = 0
+
+    def get_size(self) -> int:
+        """
+        Return number of keys that have not expired, sweeping the expired
+        ones first
+        """
+        self._sweep(None, self._clock())
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of the underlying map
+        """
+        return self._map.get_capacity()
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key that has not expired
+        """
+        now = self._clock()
+        for key, entry in self._map.items():
+            if entry.deadline is None or entry.deadline > now:
+                yield key, entry.value
+
+    def keys(self):
+        """
+        Yields every key that has not expired
+        """
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        """
+        Yields every value whose key has not expired
+        """
+        for _, value in self.items():
+            yield value
+
+    def __iter__(self):
+        """
+        Iterates over the keys that have not expired, like a dict
+        """
+        return self.keys()
+
+
+# input array and hash function of the running find_mode_parallel,
+# inherited by pool workers without copying when the pool forks
+_worker_input = None
+
+
+def _init_worker(da: DynamicArray, function) -> None:
+    """
+    Pool initializer storing the input shared by every task
+    """
+    global _worker_input
+    _worker_input = da, function
+
+
+def _shard(key: str, shards: int) -> int:
+    """
+    Returns the shard of a key, the same in every process
+    Python's own string hash is salted per process when they are spawned
+    """
+    return zlib.crc32(key.encode('utf-8', 'surrogatepass')) % shards
+
+
+def _count_shard(task: tuple) -> tuple[list, int]:
+    """
+    Counts the keys of da that fall in one shard in a HashMap of its own
+
+    :returns: A tuple of the shard's modes and their frequency
+    """
+    shard, shards = task
+    da, function = _worker_input
+    counts = HashMap(function=function)
+
+    for ind in range(da.length()):
+        key = da.get_at_index(ind)
+        if _shard(key, shards) == shard:
+            counts.increment(key)
+
+    modes, freq = [], 0
+    for key, count in counts.items():
+        if count > freq:
+            modes, freq = [], count
+        if count == freq:
+            modes.append(key)
+    return modes, freq
+
+
+def find_mode_parallel(da: DynamicArray, processes: int = None,
+                       function='builtin') -> tuple[DynamicArray, int]:
+    """
+    Same result as find_mode, counted by a pool of processes
+    Keys are split into one shard per process by a hash of the key; each
+    process reads all of da but only counts the keys of its own shard, so
+    no process handles every distinct key and only the shards' modes are
+    sent back. Modes come back in no particular order
+
+    Where processes are spawned rather than forked, da is copied to each
+    worker and function must be a registered name or a module level
+    function, and callers need the usual `if __name__ == "__main__"` guard
+
+    :param da: DynamicArray of string keys
+    :param processes: size of the pool, defaults to the number of CPUs
+    :param function: hash function of the frequency maps, or its registered name
+
+    :returns: A tuple consisting of the mode and frequency.
+    """
+    processes = processes or os.cpu_count() or 1
+    length = da.length()
+
+    # not worth starting processes for
+    if processes == 1 or length < 10_000 * processes:
+        return find_mode(da, function)
+
+    # forked workers share da instead of receiving a pickled copy
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    with context.Pool(processes, _init_worker, (da, function)) as pool:
+        shards = pool.map(_count_shard, [(shard, processes)
+                                         for shard in range(processes)])
+
+    # the shards hold disjoint keys, so their modes only need comparing
+    mode_arr = DynamicArray()
+    freq = 0
+    for modes, shard_freq in shards:
+        if shard_freq > freq:
+            mode_arr, freq = DynamicArray(), shard_freq
+        if shard_freq == freq:
+            for key in modes:
+                mode_arr.append(key)
+
+    return mode_arr, freq
+
 # ------------------- BASIC TESTING ---------------------------------------- #
 
 if __name__ == "__main__":
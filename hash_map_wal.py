@@ -0,0 +1,345 @@
+# Description: Hash map whose changes survive restarts, recorded in an
+#              append-only write-ahead log that is periodically compacted
+#              into a dump() snapshot.
+
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+import hash_map_sc
+
+# every log record is its payload length, a CRC-32 of the payload seeded
+# with the op code, the op code, then the pickled payload
+_RECORD = struct.Struct('<IIB')
+_PUT, _REMOVE, _CLEAR = 1, 2, 3
+
+# returned by pop when the key is absent
+_MISSING = object()
+
+
+def _fsync_directory(path: str) -> None:
+    """
+    Makes a rename inside directory path durable, where the platform
+    allows opening directories
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DurableHashMap:
+    """
+    Hash map that keeps its contents in directory: a snapshot written by
+    the map's dump() plus a log of every put, remove and clear made since.
+    Opening the directory again loads the snapshot and replays the log.
+
+    Changes are applied to the map right away and appended to the log in
+    groups (group commit): the pending records are written and fsync'ed
+    once batch_size of them are waiting or the oldest has waited
+    sync_interval seconds, whichever comes first. A crash loses at most
+    those pending records; sync() forces them out and sync_interval=0
+    syncs every change. A record torn by a crash fails its checksum and is
+    cut off on recovery.
+
+    Once the log grows past compact_size bytes the whole map is dumped to
+    a new snapshot and the log starts over. Every record is a blind write
+    of a key's new state, so replaying a log that a crash kept next to the
+    snapshot it was compacted into gives the same map again.
+
+    Reads go straight to the underlying map. Like HashMap, the map is not
+    safe to change from several threads.
+    """
+
+    def __init__(self, directory: str,
+                 map_class: type = hash_map_sc.HashMap,
+                 function='fnv1a',
+                 capacity: int = 11,
+                 sync_interval: float = 0.05,
+                 batch_size: int = 1000,
+                 compact_size: int = 64 << 20) -> None:
+        """
+        Open the durable map kept in directory, creating it if needed
+
+        map_class is the hash map keeping the contents in memory, any class
+        with dump()/load(); function hashes its keys and is passed to load()
+        when directory holds a snapshot, capacity is only used to create it
+        when it does not
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._snapshot_path = os.path.join(directory, 'snapshot')
+        self._log_path = os.path.join(directory, 'log')
+
+        self._sync_interval = sync_interval
+        self._batch_size = batch_size
+        self._compact_size = compact_size
+
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, 'rb') as file:
+                self._map = map_class.load(file, function)
+        else:
+            self._map = map_class(capacity, function)
+
+        self._log_size = self._replay()
+        self._log = open(self._log_path, 'ab')
+
+        # records waiting for the next group commit, and the timer that
+        # commits them once the oldest has waited sync_interval seconds
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _replay(self) -> int:
+        """
+        Applies every intact log record to the map and cuts off a torn one
+        left by a crash
+
+        :returns: The size of the log that was kept
+        """
+        if not os.path.exists(self._log_path):
+            return 0
+
+        with open(self._log_path, 'rb') as file:
+            data = file.read()
+
+        at = 0
+        while at + _RECORD.size <= len(data):
+            length, checksum, op = _RECORD.unpack_from(data, at)
+            start = at + _RECORD.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload, op) != checksum:
+                break
+
+            if op == _PUT:
+                self._map.put(*pickle.loads(payload))
+            elif op == _REMOVE:
+                self._map.remove(pickle.loads(payload))
+            else:
+                self._map.clear()
+            at = start + length
+
+        if at < len(data):
+            with open(self._log_path, 'r+b') as file:
+                file.truncate(at)
+                os.fsync(file.fileno())
+        return at
+
+    def _record(self, op: int, item: object = None) -> None:
+        """
+        Queues a log record for the next group commit, committing right
+        away once batch_size records wait or sync_interval is 0
+        """
+        payload = b'' if item is None else \
+            pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        record = _RECORD.pack(len(payload), zlib.crc32(payload, op), op) + payload
+
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self._batch_size or not self._sync_interval:
+                self._commit()
+            elif self._timer is None:
+                self._timer = threading.Timer(self._sync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if self._log_size >= self._compact_size:
+            self.compact()
+
+    def _commit(self) -> None:
+        """
+        Writes the pending records to the log and fsyncs it
+        Called with the lock held
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        data = b''.join(self._pending)
+        self._pending = []
+        self._log.write(data)
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._log_size += len(data)
+
+    def sync(self) -> None:
+        """
+        Makes every change so far durable
+        """
+        with self._lock:
+            self._commit()
+
+    def compact(self) -> None:
+        """
+        Writes the whole map to a new snapshot and empties the log
+        """
+        with self._lock:
+            self._commit()
+
+            # the new snapshot only replaces the old one once it is complete
+            temporary = self._snapshot_path + '.tmp'
+            with open(temporary, 'wb') as file:
+                self._map.dump(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self._snapshot_path)
+            _fsync_directory(self._directory)
+
+            self._log.truncate(0)
+            os.fsync(self._log.fileno())
+            self._log_size = 0
+
+    def close(self) -> None:
+        """
+        Makes every change durable and closes the log
+        """
+        self.sync()
+        self._log.close()
+
+    def __enter__(self) -> 'DurableHashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds key/value pair to the map, replacing the value if key exists
+        """
+        self._map.put(key, value)
+        self._record(_PUT, (key, value))
+
+    def remove(self, key: str) -> None:
+        """
+        Removes given key and its value from the map
+        If key not in the map, nothing happens and nothing is logged
+        """
+        if self._map.pop(key, _MISSING) is not _MISSING:
+            self._record(_REMOVE, key)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes given key from the map and returns its value
+        If key not in the map, returns default
+        """
+        value = self._map.pop(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._record(_REMOVE, key)
+        return value
+
+    def update_with(self, key: str, function: callable,
+                    default: object = None) -> object:
+        """
+        Replaces the value of given key by function(value), or adds the key
+        with value function(default); the new value is logged as a put
+        """
+        value = self._map.update_with(key, function, default)
+        self._record(_PUT, (key, value))
+        return value
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value of given key, counting from 0 when the key
+        is not in the map; the new value is logged as a put
+        """
+        value = self._map.increment(key, delta)
+        self._record(_PUT, (key, value))
+        return value
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of given key, adding it with value default first
+        when it is not in the map
+        """
+        value = self._map.setdefault(key, default)
+        self._record(_PUT, (key, value))
+        return value
+
+    def clear(self) -> None:
+        """
+        Clears the map contents
+        """
+        self._map.clear()
+        self._record(_CLEAR)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the underlying map; capacity is not logged, only snapshots
+        keep it
+        """
+        self._map.resize_table(new_capacity)
+
+    def get(self, key: str) -> object:
+        """
+        Returns value associated with given key, or None if it is not found
+        """
+        return self._map.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key is in the map, otherwise returns False
+        """
+        return self._map.contains_key(key)
+
+    def get_size(self) -> int:
+        """
+        Returns the number of keys in the map
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Returns the capacity of the underlying map
+        """
+        return self._map.get_capacity()
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor of the underlying map
+        """
+        return self._map.table_load()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets of the underlying map
+        """
+        return self._map.empty_buckets()
+
+    def get_keys_and_values(self):
+        """
+        Returns DynamicArray object of every (key, value) tuple in the map
+        """
+        return self._map.get_keys_and_values()
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key in the map
+        """
+        return self._map.items()
+
+    def keys(self):
+        """
+        Yields every key in the map
+        """
+        return self._map.keys()
+
+    def values(self):
+        """
+        Yields every value in the map
+        """
+        return self._map.values()
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the map, like a dict
+        """
+        return self.keys()
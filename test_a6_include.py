@@ -0,0 +1,14 @@
+# Description: Tests for the shared data structures and hash functions,
+#              run with pytest.
+
+from a6_include import (hash_function_1, hash_function_1_batch,
+                        hash_function_2, hash_function_2_batch)
+
+
+def test_batch_hashes_of_mixed_lengths_match_scalar_functions():
+    keys = ['key' + str(i) for i in range(1000)]
+    # one long key among short ones, plus empty and non-BMP keys
+    keys[500:500] = ['', 'x' * 5000, '\U0001f600', '\ud800', 'a', '']
+    assert hash_function_1_batch(keys) == [hash_function_1(key) for key in keys]
+    assert hash_function_2_batch(keys) == [hash_function_2(key) for key in keys]
+    assert hash_function_1_batch([]) == hash_function_2_batch([]) == []
@@ -0,0 +1,200 @@
+# Description: Tests for the open addressing hash maps, run with pytest.
+
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from a6_include import HASH_FUNCTIONS, fnv1a_hash
+from hash_map_oa import (CompactHashMap, HashMap, MappedHashMap, RobinHoodHashMap,
+                         SharedHashMap)
+
+
+def test_dump_of_reopened_mapped_map_loads_and_takes_puts(tmp_path):
+    path = os.path.join(tmp_path, 'map')
+    with MappedHashMap(path) as m:
+        for i in range(100):
+            m.put('key' + str(i), i)
+
+    # a reopened map only rebuilds its probe histogram when first needed
+    with MappedHashMap(path) as m:
+        file = io.BytesIO()
+        m.dump(file)
+
+    file.seek(0)
+    loaded = CompactHashMap.load(file)
+    loaded.put('new', -1)
+    assert loaded.get_size() == 101
+    assert loaded.stats()['occupied_buckets'] == 101
+    assert all(loaded.get('key' + str(i)) == i for i in range(100))
+
+
+def test_dump_of_attached_shared_map_loads_and_takes_puts():
+    shared = SharedHashMap(211)
+    try:
+        for i in range(50):
+            shared.put('key' + str(i), i)
+        attached = SharedHashMap.attach(shared.get_name())
+        file = io.BytesIO()
+        attached.dump(file)
+        attached.close()
+    finally:
+        shared.close()
+        shared.unlink()
+
+    file.seek(0)
+    loaded = CompactHashMap.load(file)
+    loaded.put('new', -1)
+    assert loaded.get_size() == 51
+    assert loaded.stats()['longest_probe'] >= 1
+
+
+_READER = '''
+import sys
+from hash_map_oa import SharedHashMap
+shared = SharedHashMap.attach(sys.argv[1])
+assert shared.get('key7') == 7, shared.get('key7')
+shared.close()
+'''
+
+
+def test_shared_map_outlives_independent_readers():
+    shared = SharedHashMap(211)
+    try:
+        for i in range(50):
+            shared.put('key' + str(i), i)
+
+        # every reader is its own interpreter with its own resource tracker
+        for _ in range(3):
+            subprocess.run([sys.executable, '-c', _READER, shared.get_name()],
+                           cwd=os.path.dirname(os.path.abspath(__file__)),
+                           check=True)
+
+        attached = SharedHashMap.attach(shared.get_name())
+        assert attached.get_size() == 50
+        attached.close()
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_shared_map_reuses_overflow_of_replaced_values():
+    with SharedHashMap(4001, overflow_size=1 << 16) as shared:
+        try:
+            # each put leaves the previous value's overflow bytes behind
+            for i in range(5000):
+                shared.put('key', 'x' * 100 + str(i))
+            assert shared.get('key') == 'x' * 100 + '4999'
+
+            # live entries that really do not fit still raise
+            with pytest.raises(MemoryError, match='overflow'):
+                for i in range(1000):
+                    shared.put('key' + str(i), 'y' * 200)
+        finally:
+            shared.unlink()
+
+
+def test_shared_map_header_keeps_tombstone_limit():
+    shared = SharedHashMap(211, tombstone_limit=0.1)
+    try:
+        attached = SharedHashMap.attach(shared.get_name())
+        assert attached._tombstone_limit == 0.1
+        attached.close()
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_buffer_maps_reject_long_function_names(tmp_path):
+    name = 'f' * 40
+    HASH_FUNCTIONS[name] = fnv1a_hash
+    try:
+        with pytest.raises(ValueError):
+            SharedHashMap(11, name)
+        with pytest.raises(ValueError):
+            MappedHashMap(os.path.join(tmp_path, 'map'), function=name)
+    finally:
+        del HASH_FUNCTIONS[name]
+
+
+def test_mapped_map_reuses_overflow_of_replaced_values(tmp_path):
+    path = os.path.join(tmp_path, 'map')
+    with MappedHashMap(path, overflow_size=1 << 12) as m:
+        for i in range(5000):
+            m.put('key', 'x' * 100 + str(i))
+        assert m.get('key') == 'x' * 100 + '4999'
+        assert os.path.getsize(path) < 2 * MappedHashMap._layout_size(
+            m.get_capacity(), 24, 24, 1 << 12)
+
+
+def test_mapped_map_iterator_notices_rebuilds(tmp_path):
+    with MappedHashMap(os.path.join(tmp_path, 'map')) as m:
+        for i in range(4):
+            m.put('key' + str(i), i)
+        m.resize_table(101)
+        keys = m.keys()
+        next(keys)
+        m.resize_table(211)
+        with pytest.raises(RuntimeError):
+            list(keys)
+
+
+def test_compact_map_rejects_none_keys():
+    m = CompactHashMap(11, 'builtin')
+    m.put('key', 1)
+    with pytest.raises(TypeError):
+        m.put(None, 1)
+    with pytest.raises(TypeError):
+        m.setdefault(None, 1)
+    assert m.get_size() == 1
+    assert m.get(None) is None
+    assert not m.contains_key(None)
+    assert list(m.items()) == [('key', 1)]
+
+
+def test_compact_map_takes_hash_map_arguments():
+    m = CompactHashMap(11, 'fnv1a', 0, 0.1, True)
+    assert m.get_capacity() == 16
+    assert m._tombstone_limit == 0.1
+    with pytest.raises(ValueError):
+        CompactHashMap(11, 'fnv1a', 4)
+
+
+def test_incremental_resize_drains_before_next_resize():
+    m = HashMap(11, 'fnv1a', 1)
+    resizes = 0
+    for i in range(20000):
+        capacity = m.get_capacity()
+        draining = m._old_buckets is not None
+        m.put('key' + str(i), i)
+        if m.get_capacity() != capacity:
+            resizes += 1
+            # a resize that still had to move the rest of the old table
+            # would stall this put
+            assert not draining
+    assert resizes > 5
+    assert all(m.get('key' + str(i)) == i for i in range(20000))
+
+
+def test_str_leaves_incremental_resize_alone():
+    m = HashMap(11, 'fnv1a', 1)
+    for i in range(7):
+        m.put('key' + str(i), i)
+    assert m._old_buckets is not None
+    str(m)
+    assert m._old_buckets is not None
+
+
+@pytest.mark.parametrize('max_load', [0, -0.5, 1, 1.5])
+def test_robin_hood_map_rejects_max_load_outside_0_1(max_load):
+    with pytest.raises(ValueError):
+        RobinHoodHashMap(11, 'fnv1a', max_load)
+
+
+def test_robin_hood_map_fills_up_to_max_load():
+    m = RobinHoodHashMap(11, 'fnv1a', 0.99)
+    for i in range(1000):
+        m.put('key' + str(i), i)
+    assert all(m.get('key' + str(i)) == i for i in range(1000))
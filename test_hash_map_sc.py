@@ -0,0 +1,69 @@
+# Description: Tests for the separate chaining hash maps, run with pytest.
+
+import sys
+import threading
+
+from hash_map_sc import (ConcurrentHashMap, DynamicArray, HashMap, find_mode,
+                         find_mode_parallel)
+
+
+def test_str_leaves_incremental_resize_alone():
+    m = HashMap(11, 'fnv1a', migrate_step=1)
+    for i in range(12):
+        m.put('key' + str(i), i)
+    assert m._old_buckets is not None
+    str(m)
+    assert m._old_buckets is not None
+
+
+def test_find_mode_parallel_matches_find_mode():
+    da = DynamicArray(['key' + str(i % 997 % 113) for i in range(30000)])
+    modes, freq = find_mode(da)
+    parallel_modes, parallel_freq = find_mode_parallel(da, 3)
+    assert parallel_freq == freq
+    assert parallel_modes.length() == modes.length() > 1
+    assert sorted(parallel_modes.get_at_index(i)
+                  for i in range(parallel_modes.length())) == \
+        sorted(modes.get_at_index(i) for i in range(modes.length()))
+
+
+def test_concurrent_map_loses_nothing_under_threads():
+    m = ConcurrentHashMap(11, 'builtin', 4)
+    threads, n = 4, 3000
+    errors, done = [], threading.Event()
+
+    def work(t):
+        for i in range(n):
+            m.increment('shared' + str(i % 50))
+            own = 'thread' + str(t) + '-' + str(i)
+            m.put(own, i)
+            if m.get(own) != i:
+                errors.append(own)
+            m.remove(own)
+
+    def resize():
+        capacity = 11
+        while not done.wait(0.001):
+            m.get_size()
+            capacity = capacity * 2 if capacity < 5000 else 11
+            m.resize_table(capacity)
+
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        workers = [threading.Thread(target=work, args=(t,))
+                   for t in range(threads)]
+        resizer = threading.Thread(target=resize)
+        resizer.start()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        done.set()
+        resizer.join()
+    finally:
+        sys.setswitchinterval(old_interval)
+
+    assert not errors
+    assert m.get_size() == 50
+    assert sum(m.get('shared' + str(i)) for i in range(50)) == threads * n
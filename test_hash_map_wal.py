@@ -0,0 +1,145 @@
+# Description: Tests for the durable hash map's log recovery and group
+#              commit, run with pytest.
+
+import os
+import subprocess
+import sys
+
+from hash_map_wal import DurableHashMap
+
+
+def _log_size(directory) -> int:
+    return os.path.getsize(os.path.join(directory, 'log'))
+
+
+def _write_log(directory, data: bytes) -> None:
+    os.makedirs(directory)
+    with open(os.path.join(directory, 'log'), 'wb') as file:
+        file.write(data)
+
+
+def test_log_cut_inside_a_record_keeps_every_whole_record(tmp_path):
+    directory = os.path.join(tmp_path, 'full')
+    states, ends = [{}], []
+    with DurableHashMap(directory, sync_interval=0) as m:
+        for i in range(5):
+            m.put('key' + str(i), 'value' + str(i))
+            states.append({**states[-1], 'key' + str(i): 'value' + str(i)})
+            ends.append(_log_size(directory))
+        m.remove('key1')
+        states.append({key: value for key, value in states[-1].items()
+                       if key != 'key1'})
+        ends.append(_log_size(directory))
+    with open(os.path.join(directory, 'log'), 'rb') as file:
+        data = file.read()
+
+    # a crash can tear the log at any byte, inside a record or its header
+    for cut in range(len(data) + 1):
+        torn = os.path.join(tmp_path, 'cut' + str(cut))
+        _write_log(torn, data[:cut])
+        applied = sum(end <= cut for end in ends)
+
+        with DurableHashMap(torn) as m:
+            assert dict(m.items()) == states[applied]
+
+        # the torn tail is cut off so new records follow the last whole one
+        assert _log_size(torn) == (ends[applied - 1] if applied else 0)
+
+
+def test_corrupt_record_and_everything_after_it_are_dropped(tmp_path):
+    directory = os.path.join(tmp_path, 'map')
+    with DurableHashMap(directory, sync_interval=0) as m:
+        m.put('first', 1)
+        first_end = _log_size(directory)
+        m.put('second', 2)
+        m.put('third', 3)
+
+    with open(os.path.join(directory, 'log'), 'r+b') as file:
+        file.seek(first_end + 12)
+        byte = file.read(1)
+        file.seek(first_end + 12)
+        file.write(bytes([byte[0] ^ 0xff]))
+
+    with DurableHashMap(directory) as m:
+        assert m.get('first') == 1
+        assert m.get_size() == 1
+        m.put('fourth', 4)
+    with DurableHashMap(directory) as m:
+        assert m.get_size() == 2
+        assert m.get('fourth') == 4
+
+
+_WRITER = '''
+import os
+import sys
+from hash_map_wal import DurableHashMap
+m = DurableHashMap(sys.argv[1], sync_interval=60, batch_size=1000)
+for i in range(250):
+    m.put('synced' + str(i), i)
+m.sync()
+print('synced', flush=True)
+for i in range(250):
+    m.put('pending' + str(i), i)
+os._exit(0)
+'''
+
+
+def test_killed_process_keeps_every_synced_write(tmp_path):
+    directory = os.path.join(tmp_path, 'map')
+    result = subprocess.run([sys.executable, '-c', _WRITER, directory],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == 'synced\n'
+
+    with DurableHashMap(directory) as m:
+        assert m.get_size() == 250
+        assert all(m.get('synced' + str(i)) == i for i in range(250))
+        assert not m.contains_key('pending0')
+
+
+def test_group_commit_writes_full_batches(tmp_path):
+    directory = os.path.join(tmp_path, 'map')
+    with DurableHashMap(directory, sync_interval=60, batch_size=3) as m:
+        m.put('a', 1)
+        m.put('b', 2)
+        assert _log_size(directory) == 0
+        m.put('c', 3)
+        batch = _log_size(directory)
+        assert batch > 0
+        m.put('d', 4)
+        assert _log_size(directory) == batch
+        m.sync()
+        assert _log_size(directory) > batch
+
+
+def test_group_commit_writes_after_sync_interval(tmp_path):
+    directory = os.path.join(tmp_path, 'map')
+    with DurableHashMap(directory, sync_interval=0.05) as m:
+        m.put('a', 1)
+        timer = m._timer
+        assert _log_size(directory) == 0
+        timer.join()
+        assert _log_size(directory) > 0
+        assert m._timer is None
+
+
+def test_log_left_beside_a_new_snapshot_replays_to_the_same_map(tmp_path):
+    directory = os.path.join(tmp_path, 'map')
+    with DurableHashMap(directory, sync_interval=0) as m:
+        for i in range(20):
+            m.put('key' + str(i), i)
+        m.remove('key3')
+        m.increment('key4', 10)
+    with open(os.path.join(directory, 'log'), 'rb') as file:
+        log = file.read()
+
+    # a crash between writing the snapshot and emptying the log
+    with DurableHashMap(directory) as m:
+        m.compact()
+    with open(os.path.join(directory, 'log'), 'wb') as file:
+        file.write(log)
+
+    with DurableHashMap(directory) as m:
+        assert m.get_size() == 19
+        assert m.get('key3') is None
+        assert m.get('key4') == 14